@@ -0,0 +1,67 @@
+# EPC Checkpoints
+# Completed merge batches and compared master sheets are written to checkpoints/ as they
+# finish, so a run that dies (e.g. during the final merge) can be resumed without parsing
+# everything again. Items are pickled (categoricals and Arrow strings stay compact) and
+# written atomically; a checkpoint is removed once its run has saved its outputs.
+
+import os
+import pickle
+import shutil
+import hashlib
+from pathlib import Path
+
+CHECKPOINT_FOLDER = "checkpoints"
+
+
+def file_fingerprint(path):
+    """Path, size and modification time: changes whenever the file is replaced or edited"""
+    try:
+        stat = os.stat(path)
+        return (os.path.abspath(path), stat.st_size, int(stat.st_mtime))
+    except OSError:
+        return (os.path.abspath(path), None, None)
+
+
+def checkpoint_key(*parts):
+    """Short stable key for any repr-able combination of inputs and options"""
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:16]
+
+
+class Checkpoint:
+    """One run's checkpoint folder: {item key: pickled object}; keys() come back sorted by name"""
+
+    def __init__(self, name, folder=CHECKPOINT_FOLDER):
+        self.folder = Path(folder) / name
+
+    def _path(self, key):
+        return self.folder / f"{key}.pkl"
+
+    def save(self, key, obj):
+        self.folder.mkdir(parents=True, exist_ok=True)
+        temp = self.folder / f"{key}.tmp"
+        with open(temp, "wb") as f:
+            pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp, self._path(key))  # A crash mid-write never leaves a half item
+
+    def load(self, key):
+        """The saved object, or None if the item is missing or unreadable"""
+        path = self._path(key)
+        if not path.exists():
+            return None
+        try:
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except Exception as e:
+            print(f"⚠️ Ignoring unreadable checkpoint {path}: {e}")
+            return None
+
+    def keys(self):
+        if not self.folder.exists():
+            return []
+        return sorted(p.stem for p in self.folder.glob("*.pkl"))
+
+    def __contains__(self, key):
+        return self._path(key).exists()
+
+    def clear(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
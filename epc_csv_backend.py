@@ -0,0 +1,115 @@
+# EPC CSV Backends
+# One entry point for CSV parsing with a pluggable backend: pyarrow's multithreaded reader
+# when it is installed, pandas' C engine otherwise. Odd files — rows of the wrong width,
+# encodings or quoting pyarrow rejects — are re-read with pandas, so the tools get the same
+# rows either way.
+# Set EPC_CSV_BACKEND=pandas (or pyarrow / auto, the default) to pick the backend.
+# With a row filter (epc_filter.EpcFilter) the file is read in chunks / record batches and
+# non-matching rows are dropped from each one before the next is read.
+
+import os
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = pa_csv = None
+
+BACKEND_ENV = "EPC_CSV_BACKEND"
+BACKENDS = ("pyarrow", "pandas")
+CHUNK_ROWS = 200000  # Rows per pandas chunk when a row filter is pushed down
+
+
+def csv_backend():
+    """Backend in use: EPC_CSV_BACKEND if set and available, else pyarrow when installed"""
+    choice = os.environ.get(BACKEND_ENV, "auto").strip().lower()
+    if choice == "pandas" or pa_csv is None:
+        return "pandas"
+    return "pyarrow"
+
+
+def _read_pandas(file, sep, header, skiprows, usecols, nrows, dtype, row_filter=None, filter_column=None):
+    options = dict(sep=sep, header=header, skiprows=skiprows, usecols=usecols, nrows=nrows,
+                   dtype=dtype, on_bad_lines="skip")
+    if row_filter is None:
+        return pd.read_csv(file, **options)
+
+    kept = [chunk[row_filter.mask(chunk[filter_column])]
+            for chunk in pd.read_csv(file, chunksize=CHUNK_ROWS, **options)]
+    if not kept:
+        return pd.read_csv(file, **{**options, "nrows": 0})
+    return pd.concat(kept, ignore_index=True)
+
+
+def _read_pyarrow(file, sep, header, skiprows, usecols, dtype, row_filter=None, filter_column=None):
+    """pyarrow read; None when the file has rows of the wrong width (pandas keeps short rows)"""
+    # Without a header pyarrow names columns f0, f1, ...; pandas numbers them 0, 1, ...
+    names = None
+    if usecols is not None:
+        names = [f"f{c}" for c in usecols] if header is None else list(usecols)
+    column_types = {name: pa.string() for name in names} if dtype is str and names else {}
+    if row_filter is not None:
+        filter_key = f"f{filter_column}" if header is None else filter_column
+        column_types[filter_key] = pa.string()
+    invalid_rows = []
+
+    def skip_row(row):
+        invalid_rows.append(row.number)
+        return "skip"
+
+    def read(column_types):
+        options = dict(
+            read_options=pa_csv.ReadOptions(skip_rows=skiprows or 0, autogenerate_column_names=header is None),
+            parse_options=pa_csv.ParseOptions(delimiter=sep, invalid_row_handler=skip_row),
+            convert_options=pa_csv.ConvertOptions(include_columns=names, column_types=column_types,
+                                                  strings_can_be_null=True),
+        )
+        if row_filter is None:
+            return pa_csv.read_csv(file, **options)
+        # Stream record batches and keep only the matching rows of each
+        reader = pa_csv.open_csv(file, **options)
+        batches = [batch.filter(row_filter.arrow_mask(batch.column(filter_key))) for batch in reader]
+        return pa.Table.from_batches(batches, schema=reader.schema)
+
+    table = read(column_types)
+    if invalid_rows:
+        return None
+    # pandas leaves dates and times as text unless asked to parse them
+    temporal = [f.name for f in table.schema if pa.types.is_temporal(f.type)]
+    if temporal:
+        table = read({**column_types, **{name: pa.string() for name in temporal}})
+
+    df = table.to_pandas()
+    if header is None:
+        df.columns = [int(str(c)[1:]) for c in df.columns]
+        if usecols is not None:
+            df = df[sorted(df.columns)]
+    return df
+
+
+def read_csv(file, sep=",", header="infer", skiprows=None, usecols=None, nrows=None, dtype=None, backend=None,
+             row_filter=None, filter_column=None):
+    """
+    pd.read_csv(..., on_bad_lines="skip") through the selected backend. pyarrow handles
+    whole-file reads with usecols given as a list; previews (nrows), callable usecols and
+    all-text reads without usecols go to pandas. row_filter keeps only the rows whose
+    filter_column matches it, filtering while the file is read.
+    """
+    backend = backend or csv_backend()
+    header = 0 if header == "infer" else header
+    simple = (nrows is None and header in (0, None) and not callable(usecols)
+              and not (dtype is not None and usecols is None))
+    if backend == "pyarrow" and pa_csv is not None and simple and dtype in (None, str):
+        try:
+            df = _read_pyarrow(file, sep, header, skiprows, usecols, dtype, row_filter, filter_column)
+            if df is not None:
+                return df
+        except Exception as e:
+            print(f"⚠️ Fast CSV reader could not parse {os.path.basename(str(file))} ({e}); using pandas.")
+    return _read_pandas(file, sep, header, skiprows, usecols, nrows, dtype, row_filter, filter_column)
+
+
+def read_csv_header(file, sep=","):
+    """Column names of a CSV with a header row"""
+    return list(pd.read_csv(file, sep=sep, nrows=0).columns)
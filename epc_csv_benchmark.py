@@ -0,0 +1,98 @@
+# EPC CSV Backend Benchmark
+# Parse throughput of each CSV backend on typical scan layouts. Without arguments it
+# generates sample files (plain export, reader export with preamble and ';', wide handheld
+# export); pass real scan files to measure those instead.
+#
+#   python epc_csv_benchmark.py [--rows 500000] [--repeat 3] [scan files ...]
+
+import os
+import time
+import argparse
+import tempfile
+import numpy as np
+
+from epc_csv_backend import BACKENDS, pa_csv, read_csv
+from epc_parse_profile import build_parse_profile
+
+LAYOUTS = {
+    "plain": {"preamble": [], "sep": ",", "header": ["EPC", "RSSI", "Antenna", "Time"]},
+    "reader_export": {"preamble": ["Reader: FX9600", "Session: 2", ""], "sep": ";",
+                      "header": ["Time", "EPC", "RSSI", "Antenna"]},
+    "handheld_wide": {"preamble": ["Inventory export"], "sep": ",",
+                      "header": ["EPC", "TID", "RSSI", "Phase", "Frequency", "Count", "User", "Time"]},
+}
+
+
+def write_sample(path, layout, rows, rng):
+    """Write a synthetic scan file with the given layout"""
+    epcs = np.char.add("3034257BF7194E4", np.char.zfill(rng.integers(0, 10**9, rows).astype(str), 9))
+    columns = {
+        "EPC": epcs,
+        "TID": np.char.add("E2801170", np.char.zfill(rng.integers(0, 10**9, rows).astype(str), 16)),
+        "RSSI": rng.integers(-85, -35, rows).astype(str),
+        "Antenna": rng.integers(1, 5, rows).astype(str),
+        "Phase": rng.integers(0, 4096, rows).astype(str),
+        "Frequency": np.full(rows, "902750"),
+        "Count": rng.integers(1, 20, rows).astype(str),
+        "User": np.full(rows, ""),
+        "Time": np.full(rows, "2026-01-01 10:00:00"),
+    }
+    sep = layout["sep"]
+    with open(path, "w", encoding="utf-8") as f:
+        for line in layout["preamble"]:
+            f.write(line + "\n")
+        f.write(sep.join(layout["header"]) + "\n")
+        body = columns[layout["header"][0]]
+        for name in layout["header"][1:]:
+            body = np.char.add(np.char.add(body, sep), columns[name])
+        f.write("\n".join(body.tolist()) + "\n")
+
+
+def time_backend(file, profile, backend, repeat):
+    """Best-of-repeat seconds to parse the EPC / RSSI columns the way the mergers do"""
+    columns = [profile["epc_column"]] + ([profile["rssi_column"]] if profile.get("rssi_column") is not None else [])
+    best, rows = None, 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = read_csv(file, header=None, sep=profile["delimiter"], skiprows=profile["start_row"],
+                      usecols=columns, backend=backend)
+        elapsed = time.perf_counter() - start
+        best, rows = elapsed if best is None else min(best, elapsed), len(df)
+    return best, rows
+
+
+def run_benchmark(files, repeat):
+    backends = [b for b in BACKENDS if b != "pyarrow" or pa_csv is not None]
+    if pa_csv is None:
+        print("⚠️ pyarrow is not installed — only the pandas backend is measured.")
+    print(f"{'File':<28}{'Backend':<10}{'Rows':>10}{'Seconds':>10}{'MB/s':>10}{'Rows/s':>14}")
+    for file in files:
+        profile = build_parse_profile(file)
+        if profile is None:
+            print(f"⚠️ Skipping {file} — no EPC-like data found.")
+            continue
+        size_mb = os.path.getsize(file) / 1e6
+        for backend in backends:
+            seconds, rows = time_backend(file, profile, backend, repeat)
+            print(f"{os.path.basename(file)[:27]:<28}{backend:<10}{rows:>10}{seconds:>10.3f}"
+                  f"{size_mb / seconds:>10.1f}{rows / seconds:>14,.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare CSV parsing backends on scan files")
+    parser.add_argument("files", nargs="*", help="Scan files to parse (default: generated samples)")
+    parser.add_argument("--rows", type=int, default=500000, help="Rows per generated sample file")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per file and backend (best is reported)")
+    args = parser.parse_args()
+
+    if args.files:
+        run_benchmark(args.files, args.repeat)
+    else:
+        with tempfile.TemporaryDirectory() as folder:
+            rng = np.random.default_rng(0)
+            files = []
+            for name, layout in LAYOUTS.items():
+                path = os.path.join(folder, f"{name}.csv")
+                write_sample(path, layout, args.rows, rng)
+                files.append(path)
+            run_benchmark(files, args.repeat)
@@ -0,0 +1,228 @@
+# EPC Live Coverage Server
+# Loads master files once into an in-memory EPC index, ingests scan files uploaded by
+# handhelds over HTTP (localhost) and answers found / not-found coverage queries incrementally
+#
+#   python epc_daemon.py [--port 8765] [master files...]
+#
+#   POST /scan?name=Reader_Location_1.csv   body = raw scan file (CSV)
+#        (&naming=location for Location_N file names, or &reader=..&location=.. to override)
+#   GET  /coverage                          totals + per master file
+#   GET  /epc?epc=<EPC>                     one tag
+#   GET  /not_found?limit=100               master EPCs not found yet
+
+import os
+import sys
+import json
+import argparse
+import threading
+from pathlib import Path
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+import pandas as pd
+
+from epc_merger_reader import read_file_flexible
+from epc_master_comparison import select_files_and_folders, build_master_tasks, read_master_file, detect_epc_column
+from epc_parse_profile import is_epc_like
+from epc_manifest import file_metadata
+
+DEFAULT_PORT = 8765
+UPLOAD_FOLDER = "daemon_uploads"
+MAX_UPLOAD_BYTES = 512 * 1024 * 1024
+
+
+class CoverageIndex:
+    """Master EPCs held in memory with found flags and last-seen Location/Reader"""
+
+    def __init__(self, master_files):
+        frames = []
+        for master_file, sheet, _ in build_master_tasks(master_files):
+            df = read_master_file(master_file, sheet)
+            epc_col = detect_epc_column(df)
+            if epc_col is None:
+                print(f"⚠️ Skipping {master_file} [{sheet}] — no EPC column found.")
+                continue
+            frames.append(pd.DataFrame({
+                "EPC": df[epc_col].astype(str).str.strip(),
+                "Master File": Path(master_file).stem,
+            }))
+        if not frames:
+            raise ValueError("No EPCs loaded from master files.")
+
+        # An EPC listed in several masters counts towards each of them
+        masters = pd.concat(frames, ignore_index=True).drop_duplicates(["Master File", "EPC"])
+        self.epcs = pd.Index(pd.unique(masters["EPC"]))
+        self.master_rows = pd.DataFrame({
+            "Master File": masters["Master File"].to_numpy(),
+            "Position": self.epcs.get_indexer(masters["EPC"]),
+        })
+        self.master_file = (
+            masters.groupby("EPC", sort=False)["Master File"].agg(", ".join).reindex(self.epcs).to_numpy()
+        )
+        self.found = np.zeros(len(self.epcs), dtype=bool)
+        self.location = np.full(len(self.epcs), "", dtype=object)
+        self.reader = np.full(len(self.epcs), "", dtype=object)
+        self.unexpected = set()
+        self.files_ingested = 0
+        self.lock = threading.Lock()
+        print(f"📦 Master index ready: {len(self.epcs)} unique EPCs")
+
+    def ingest(self, scans):
+        """Mark scanned EPCs (DataFrame with EPC, Location, Reader) as found; returns counts"""
+        positions = self.epcs.get_indexer(scans["EPC"])
+        hit = positions >= 0
+        with self.lock:
+            newly_found = int((~self.found[positions[hit]]).sum()) if hit.any() else 0
+            self.found[positions[hit]] = True
+            self.location[positions[hit]] = scans["Location"].to_numpy()[hit]
+            self.reader[positions[hit]] = scans["Reader"].to_numpy()[hit]
+            self.unexpected.update(scans["EPC"].to_numpy()[~hit])
+            self.files_ingested += 1
+        return {"rows": len(scans), "matched": int(hit.sum()), "newly_found": newly_found}
+
+    def coverage(self):
+        with self.lock:
+            found = self.found.copy()
+            unexpected = len(self.unexpected)
+            files = self.files_ingested
+        per_file = (
+            self.master_rows.assign(Found=found[self.master_rows["Position"].to_numpy()])
+            .groupby("Master File")["Found"].agg(["size", "sum"])
+        )
+        return {
+            "total": len(found),
+            "found": int(found.sum()),
+            "percent_found": round(100 * found.mean(), 2) if len(found) else 0.0,
+            "unexpected": unexpected,
+            "files_ingested": files,
+            "per_master_file": {
+                name: {"total": int(row["size"]), "found": int(row["sum"])}
+                for name, row in per_file.iterrows()
+            },
+        }
+
+    def lookup(self, epc):
+        pos = self.epcs.get_indexer([epc])[0]
+        if pos < 0:
+            return {"epc": epc, "in_master": False, "scanned": epc in self.unexpected}
+        return {
+            "epc": epc, "in_master": True, "found": bool(self.found[pos]),
+            "location": self.location[pos], "reader": self.reader[pos],
+            "master_file": self.master_file[pos],
+        }
+
+    def not_found(self, limit):
+        with self.lock:
+            missing = self.epcs[~self.found]
+        return missing[:limit].tolist()
+
+
+def parse_scan_file(path, name, naming="reader", reader=None, location=None):
+    """
+    Parse an uploaded scan file with the merger rules. Reader/Location come from the
+    file name (Reader_Location_N, or Location_N with naming="location") unless given.
+    """
+    df = read_file_flexible(path)
+    df = df.dropna(axis=1, how="all").dropna(axis=0, how="all")
+    if df.empty:
+        return pd.DataFrame(columns=["EPC", "Location", "Reader"])
+
+    # Same auto-pick as the merger preview: the column with the most EPC-like values
+    scores = {col: int(df[col].dropna().head(200).map(is_epc_like).sum()) for col in df.columns}
+    epc_col = max(scores, key=scores.get)
+
+    fields = ("Location",) if naming == "location" else ("Reader", "Location")
+    from_name = {"Reader": "Unknown", **file_metadata(name, None, fields)}
+
+    scans = pd.DataFrame({"EPC": df[epc_col].dropna().astype(str).str.strip()})
+    scans["Reader"] = reader or from_name["Reader"]
+    scans["Location"] = location or from_name["Location"]
+    return scans.drop_duplicates("EPC", keep="last")
+
+
+def make_handler(index):
+    class Handler(BaseHTTPRequestHandler):
+        def send_json(self, payload, status=200):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            if url.path == "/coverage":
+                self.send_json(index.coverage())
+            elif url.path == "/epc" and "epc" in query:
+                self.send_json(index.lookup(query["epc"][0].strip()))
+            elif url.path == "/not_found":
+                try:
+                    limit = int(query.get("limit", ["100"])[0])
+                    if limit < 0:
+                        raise ValueError
+                except ValueError:
+                    self.send_json({"error": "limit must be a non-negative whole number"}, 400)
+                    return
+                self.send_json({"not_found": index.not_found(limit)})
+            else:
+                self.send_json({"error": "unknown endpoint"}, 404)
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            if url.path != "/scan":
+                self.send_json({"error": "unknown endpoint"}, 404)
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            if not 0 < length <= MAX_UPLOAD_BYTES:
+                self.send_json({"error": "missing or oversized upload"}, 400)
+                return
+
+            query = {key: values[0] for key, values in parse_qs(url.query).items()}
+            name = Path(query.get("name", "Upload.csv")).name
+            os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+            path = os.path.join(UPLOAD_FOLDER, f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{name}")
+            with open(path, "wb") as f:
+                f.write(self.rfile.read(length))
+
+            try:
+                scans = parse_scan_file(path, name, query.get("naming", "reader"),
+                                        query.get("reader"), query.get("location"))
+                result = index.ingest(scans)
+            except Exception as e:
+                self.send_json({"error": f"could not parse {name}: {e}"}, 400)
+                return
+            print(f"📥 {name}: {result['matched']}/{result['rows']} matched, {result['newly_found']} newly found")
+            self.send_json(result)
+
+        def log_message(self, format, *args):
+            pass  # Keep the console for ingest lines
+
+    return Handler
+
+
+def run_server(master_files, port=DEFAULT_PORT):
+    index = CoverageIndex(master_files)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(index))
+    print(f"🌐 Serving coverage on http://127.0.0.1:{port} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("🛑 Stopped.")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EPC live coverage server")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("masters", nargs="*", help="Master database files (dialog if omitted)")
+    args = parser.parse_args()
+
+    master_files = args.masters or select_files_and_folders("Master Database Files")
+    if not master_files:
+        print("❌ No master database files selected.")
+        sys.exit(0)
+    run_server(master_files, args.port)
@@ -0,0 +1,53 @@
+# EPC Column Dtypes
+# Compact dtypes for raw read rows: Reader / Location / File Name as categoricals
+# (one small dictionary per column instead of a Python string on every row) and
+# EPCs as Arrow-backed strings when pyarrow is installed
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+CATEGORY_COLUMNS = ("Reader", "Location", "File Name")
+
+try:
+    import pyarrow  # noqa: F401
+    EPC_DTYPE = pd.StringDtype("pyarrow")
+except ImportError:
+    EPC_DTYPE = pd.StringDtype()
+
+
+def as_epc_strings(series):
+    """EPC values as (Arrow-backed) strings"""
+    return series.astype(str).astype(EPC_DTYPE)
+
+
+def add_constant_columns(df, values):
+    """Add {column: value} columns holding one value for every row, as single-category columns"""
+    codes = np.zeros(len(df), dtype=np.int8)
+    for col, value in values.items():
+        df[col] = pd.Series(pd.Categorical.from_codes(codes, categories=[value]), index=df.index)
+    return df
+
+
+def to_categories(df, columns):
+    """Convert the given text columns to categoricals (in place)"""
+    for col in columns:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(str).astype("category")
+    return df
+
+
+def concat_compact(frames, columns=CATEGORY_COLUMNS):
+    """
+    pd.concat that keeps categorical columns categorical: pandas falls back to plain
+    strings when categories differ, so every frame is first given the union of categories.
+    """
+    frames = [f for f in frames if f is not None]
+    for col in columns:
+        if not frames or not all(col in f.columns for f in frames):
+            continue
+        parts = [f[col] if isinstance(f[col].dtype, pd.CategoricalDtype) else f[col].astype(str).astype("category")
+                 for f in frames]
+        categories = union_categoricals(parts, ignore_order=True).categories
+        frames = [f.assign(**{col: part.cat.set_categories(categories)}) for f, part in zip(frames, parts)]
+    return pd.concat(frames, ignore_index=True)
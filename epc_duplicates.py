@@ -0,0 +1,64 @@
+# EPC Duplicate Analytics
+# Counts duplicate EPCs inside each source (master file / sheet, merged file) and EPCs that
+# collide across sources, in one counting pass over factorized EPC codes
+
+import numpy as np
+import pandas as pd
+
+
+def _usable(epcs):
+    """EPCs as stripped strings, without blanks / NaN (those are not duplicates)"""
+    epcs = pd.Series(epcs, dtype=object).dropna().astype(str).str.strip().to_numpy(dtype=object)
+    return epcs[(epcs != "") & (epcs != "nan")]
+
+
+def duplicate_report(labelled_epcs):
+    """
+    labelled_epcs: [(source label, array of EPCs)]. Returns (per_source, duplicates):
+    per_source - one row per source with (non-blank) rows, unique EPCs, duplicate rows and
+                 EPCs also present in another source
+    duplicates - every EPC that occurs more than once anywhere, with the sources it is in
+    """
+    labelled_epcs = [(label, _usable(epcs)) for label, epcs in labelled_epcs]
+    labels = np.array([label for label, _ in labelled_epcs], dtype=object)
+    lengths = np.array([len(epcs) for _, epcs in labelled_epcs], dtype=np.int64)
+    if not len(labels) or not lengths.sum():
+        return pd.DataFrame(), pd.DataFrame(columns=["EPC", "Total Rows", "Sources", "Source Names"])
+
+    codes, uniques = pd.factorize(np.concatenate([epcs for _, epcs in labelled_epcs]))
+    source = np.repeat(np.arange(len(labels)), lengths)
+
+    # One (EPC, source) pair per distinct combination, with its row count
+    pairs, pair_rows = np.unique(codes.astype(np.int64) * len(labels) + source, return_counts=True)
+    pair_code, pair_source = pairs // len(labels), pairs % len(labels)
+    sources_per_epc = np.bincount(pair_code, minlength=len(uniques))
+    rows_per_epc = np.bincount(codes, minlength=len(uniques))
+    shared = sources_per_epc[pair_code] > 1
+
+    unique_epcs = np.bincount(pair_source, minlength=len(labels))
+    per_source = pd.DataFrame({
+        "Source": labels,
+        "Rows": lengths,
+        "Unique EPCs": unique_epcs,
+        "Duplicate Rows": lengths - unique_epcs,
+        "Duplicated EPCs": np.bincount(pair_source, weights=pair_rows > 1, minlength=len(labels)).astype(np.int64),
+        "EPCs Also In Other Sources": np.bincount(pair_source, weights=shared, minlength=len(labels)).astype(np.int64),
+    })
+
+    repeated = rows_per_epc[pair_code] > 1
+    duplicates = (
+        pd.DataFrame({"EPC": uniques[pair_code[repeated]], "Source": labels[pair_source[repeated]]})
+        .groupby("EPC", sort=True)["Source"]
+        .agg(Sources="size", **{"Source Names": lambda s: ", ".join(s)})
+        .reset_index()
+    )
+    duplicates.insert(1, "Total Rows", duplicates["EPC"].map(pd.Series(rows_per_epc, index=uniques)))
+    return per_source, duplicates
+
+
+def print_duplicate_summary(name, per_source, duplicates):
+    if per_source.empty:
+        return
+    cross = int((duplicates["Sources"] > 1).sum()) if not duplicates.empty else 0
+    print(f"🧬 {name}: {int(per_source['Duplicate Rows'].sum())} duplicate rows, "
+          f"{cross} EPCs in more than one source")
@@ -0,0 +1,140 @@
+# EPC Filter Expressions
+# A small filter language for the "Filter EPCs" dialogs, compiled once per batch and
+# evaluated as whole-column operations — on Arrow record batches while a CSV is being
+# read, or on pandas columns — so non-matching reads are dropped before they are kept.
+#
+#   30, 3034                  prefixes
+#   30340000-3034FFFF         hex range on the first 8 characters (inclusive)
+#   len:24  /  len:24-32      EPC length(s)
+#   re:^3034[0-9A-F]{20}$     regular expression (searched anywhere in the EPC, any case)
+#
+# Prefixes and ranges are alternatives (a read may match any of them); length and regex
+# terms must hold as well. EPCs are compared stripped and upper-case. With EPC truncation
+# the filter applies to the truncated EPC; split() says which terms can still run early.
+
+import re
+import numpy as np
+import pandas as pd
+
+HEX_RANGE = re.compile(r"^([0-9A-F]+)-([0-9A-F]+)$")
+
+
+class EpcFilter:
+    def __init__(self, prefixes=(), ranges=(), lengths=(), patterns=()):
+        self.prefixes = list(prefixes)
+        self.ranges = list(ranges)
+        self.lengths = sorted(set(lengths))
+        self.patterns = list(patterns)
+
+    def __bool__(self):
+        return bool(self.prefixes or self.ranges or self.lengths or self.patterns)
+
+    def describe(self):
+        parts = self.prefixes + [f"{lo}-{hi}" for lo, hi in self.ranges]
+        parts += [f"len:{n}" for n in self.lengths] + [f"re:{p}" for p in self.patterns]
+        return ", ".join(parts)
+
+    def split(self, char_limit=None):
+        """
+        (read_filter, truncated_filter) for EPCs cut to char_limit characters. Prefix and
+        range terms that fit within the limit match the same reads before truncation, so they
+        form the read filter; len: and re: terms (or every term, when a prefix or range is
+        longer than the limit) form the filter to apply after truncating. Either may be None.
+        """
+        if not char_limit:
+            return self or None, None
+        fits = all(len(p) <= char_limit for p in self.prefixes) and all(len(lo) <= char_limit for lo, _ in self.ranges)
+        if not fits:
+            return None, self or None
+        read_filter = EpcFilter(self.prefixes, self.ranges)
+        truncated_filter = EpcFilter(lengths=self.lengths, patterns=self.patterns)
+        return read_filter or None, truncated_filter or None
+
+    def mask(self, epcs):
+        """Boolean NumPy mask for a pandas Series of EPCs"""
+        epcs = pd.Series(epcs).astype(str).str.strip().str.upper()
+        keep = np.ones(len(epcs), dtype=bool)
+        if self.prefixes or self.ranges:
+            wanted = epcs.str.startswith(tuple(self.prefixes)).to_numpy(dtype=bool) if self.prefixes \
+                else np.zeros(len(epcs), dtype=bool)
+            for lo, hi in self.ranges:
+                key = epcs.str.slice(0, len(lo))
+                wanted |= ((key >= lo) & (key <= hi) & (key.str.len() == len(lo))).to_numpy(dtype=bool)
+            keep &= wanted
+        if self.lengths:
+            keep &= epcs.str.len().isin(self.lengths).to_numpy(dtype=bool)
+        for pattern in self.patterns:
+            keep &= epcs.str.contains(pattern, flags=re.IGNORECASE, regex=True).fillna(False).to_numpy(dtype=bool)
+        return keep
+
+    def arrow_mask(self, column):
+        """Boolean Arrow mask for one Arrow column of EPCs (used while streaming a CSV)"""
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        epcs = pc.utf8_upper(pc.utf8_trim_whitespace(pc.cast(column, pa.string())))
+        keep = pa.array(np.ones(len(epcs), dtype=bool))
+        if self.prefixes or self.ranges:
+            wanted = pa.array(np.zeros(len(epcs), dtype=bool))
+            for prefix in self.prefixes:
+                wanted = pc.or_(wanted, pc.starts_with(epcs, pattern=prefix))
+            for lo, hi in self.ranges:
+                key = pc.utf8_slice_codeunits(epcs, 0, len(lo))
+                in_range = pc.and_(pc.greater_equal(key, lo), pc.less_equal(key, hi))
+                wanted = pc.or_(wanted, pc.and_(in_range, pc.equal(pc.utf8_length(key), len(lo))))
+            keep = pc.and_(keep, wanted)
+        if self.lengths:
+            keep = pc.and_(keep, pc.is_in(pc.utf8_length(epcs), value_set=pa.array(self.lengths, pa.int32())))
+        for pattern in self.patterns:
+            keep = pc.and_(keep, pc.match_substring_regex(epcs, pattern=pattern, ignore_case=True))
+        return pc.fill_null(keep, False)
+
+
+def parse_terms(text):
+    """Split dialog input into filter terms (commas separate terms, except inside re:)"""
+    terms = []
+    for part in (text or "").split(","):
+        part = part.strip()
+        if terms and terms[-1].lower().startswith("re:") and not re.match(r"^(len:|re:|[0-9A-Fa-f]+(-[0-9A-Fa-f]+)?$)", part, re.I):
+            terms[-1] += "," + part  # e.g. re:^30{2,4} keeps its comma
+        elif part:
+            terms.append(part)
+    return terms
+
+
+def compile_filter(terms):
+    """
+    Compile filter terms (a list, or dialog text) into an EpcFilter; None when there are none.
+    Raises ValueError for a term that is not a prefix, range, len: or re: term.
+    """
+    if isinstance(terms, str):
+        terms = parse_terms(terms)
+    epc_filter = EpcFilter()
+    for term in terms or []:
+        term = term.strip()
+        lower = term.lower()
+        if not term:
+            continue
+        if lower.startswith("re:"):
+            pattern = term[3:].strip()
+            try:
+                re.compile(pattern, re.IGNORECASE)
+            except re.error as e:
+                raise ValueError(f"Invalid regular expression '{pattern}': {e}")
+            epc_filter.patterns.append(pattern)
+        elif lower.startswith("len:"):
+            bounds = term[4:].replace(" ", "").split("-")
+            if not all(b.isdigit() for b in bounds) or len(bounds) > 2:
+                raise ValueError(f"Invalid length filter '{term}' (use len:24 or len:24-32)")
+            epc_filter.lengths.extend(range(int(bounds[0]), int(bounds[-1]) + 1))
+            epc_filter.lengths = sorted(set(epc_filter.lengths))
+        elif HEX_RANGE.match(term.upper()):
+            lo, hi = HEX_RANGE.match(term.upper()).groups()
+            if len(lo) != len(hi) or lo > hi:
+                raise ValueError(f"Invalid hex range '{term}' (both ends need the same length, low first)")
+            epc_filter.ranges.append((lo, hi))
+        elif term.isalnum():
+            epc_filter.prefixes.append(term.upper())
+        else:
+            raise ValueError(f"Unknown EPC filter '{term}'")
+    return epc_filter or None
@@ -0,0 +1,174 @@
+# EPC GS1 Decoder
+# Decodes 96-bit EPC hex (SGTIN-96, SSCC-96, GRAI-96) into header, filter, company prefix,
+# item reference and serial using NumPy bit operations over the whole column
+
+import numpy as np
+import pandas as pd
+import tkinter as tk
+from tkinter import simpledialog, messagebox
+
+GS1_COLUMNS = ["Scheme", "Header", "Filter", "Company Prefix", "Item Reference", "Serial"]
+
+# Header byte -> scheme name
+SCHEMES = {0x30: "SGTIN-96", 0x31: "SSCC-96", 0x33: "GRAI-96"}
+
+# Partition value -> (company prefix bits, company prefix digits, reference bits, reference digits)
+# SGTIN-96 and GRAI-96 share the 44-bit layout; SSCC-96 uses a 57-bit field
+PARTITIONS_44 = {
+    "SGTIN-96": [(40, 12, 4, 1), (37, 11, 7, 2), (34, 10, 10, 3), (30, 9, 14, 4),
+                 (27, 8, 17, 5), (24, 7, 20, 6), (20, 6, 24, 7)],
+    "GRAI-96": [(40, 12, 4, 0), (37, 11, 7, 1), (34, 10, 10, 2), (30, 9, 14, 3),
+                (27, 8, 17, 4), (24, 7, 20, 5), (20, 6, 24, 6)],
+}
+PARTITIONS_SSCC = [(40, 12, 17, 5), (37, 11, 20, 6), (34, 10, 24, 7), (30, 9, 27, 8),
+                   (27, 8, 30, 9), (24, 7, 34, 10), (20, 6, 37, 11)]
+
+# ASCII byte -> nibble value (255 = not a hex character)
+_HEX_LOOKUP = np.full(256, 255, dtype=np.uint8)
+for _i, _c in enumerate(b"0123456789ABCDEF"):
+    _HEX_LOOKUP[_c] = _i
+for _i, _c in enumerate(b"abcdef"):
+    _HEX_LOOKUP[_c] = 10 + _i
+
+_HEADER_TEXT = np.array([f"{i:02X}" for i in range(256)], dtype=object)
+
+_HI_SHIFTS = np.arange(28, -1, -4, dtype=np.uint64)   # 8 nibbles -> bits 95..64
+_LO_SHIFTS = np.arange(60, -1, -4, dtype=np.uint64)   # 16 nibbles -> bits 63..0
+
+
+def hex_to_words(epcs):
+    """
+    Convert a Series of 24-char EPC hex strings into (hi32, lo64, valid) uint64 arrays.
+    Rows that are not exactly 24 hex characters are marked invalid.
+    """
+    values = epcs.astype(str).str.strip()
+    values = values.where(~values.str.contains(r"[^\x00-\x7F]", regex=True), "")
+    lengths = values.str.len().to_numpy()
+    raw = np.array(values.str.slice(0, 24).tolist(), dtype="S24")
+    nibbles = _HEX_LOOKUP[raw.view(np.uint8).reshape(len(raw), 24)] if len(raw) else np.zeros((0, 24), np.uint8)
+    valid = (lengths == 24) & (nibbles != 255).all(axis=1)
+
+    nibbles = np.where(nibbles == 255, 0, nibbles).astype(np.uint64)
+    hi = (nibbles[:, :8] << _HI_SHIFTS).sum(axis=1, dtype=np.uint64)
+    lo = (nibbles[:, 8:] << _LO_SHIFTS).sum(axis=1, dtype=np.uint64)
+    return hi, lo, valid
+
+
+def _pad_digits(values, widths):
+    """Zero-pad integer values to per-row digit widths (grouped by width, not per row)"""
+    out = pd.Series(pd.NA, index=range(len(values)), dtype=object)
+    for width in np.unique(widths[widths >= 0]):
+        rows = widths == width
+        text = pd.Series(values[rows]).astype(str)
+        out[rows] = text.str.zfill(int(width)).to_numpy() if width > 0 else ""
+    return out.to_numpy()
+
+
+def decode_epcs(epcs):
+    """
+    Decode a Series of EPC hex strings into a DataFrame with GS1_COLUMNS.
+    Unsupported or malformed EPCs get Scheme "Unknown" and empty fields.
+    """
+    hi, lo, valid = hex_to_words(epcs)
+    n = len(hi)
+
+    header = ((hi >> np.uint64(24)) & np.uint64(0xFF)).astype(np.int64)
+    filt = ((hi >> np.uint64(21)) & np.uint64(0x7)).astype(np.int64)
+    partition = ((hi >> np.uint64(18)) & np.uint64(0x7)).astype(np.int64)
+    top18 = hi & np.uint64(0x3FFFF)
+
+    field44 = (top18 << np.uint64(26)) | (lo >> np.uint64(38))
+    field57 = (top18 << np.uint64(39)) | (lo >> np.uint64(25))
+    serial38 = lo & np.uint64((1 << 38) - 1)
+
+    scheme = np.full(n, "Unknown", dtype=object)
+    company = np.zeros(n, dtype=np.uint64)
+    reference = np.zeros(n, dtype=np.uint64)
+    cp_digits = np.full(n, -1, dtype=np.int64)
+    ref_digits = np.full(n, -1, dtype=np.int64)
+    serial = np.full(n, -1, dtype=np.int64)
+
+    for code, name in SCHEMES.items():
+        table = PARTITIONS_SSCC if name == "SSCC-96" else PARTITIONS_44[name]
+        field = field57 if name == "SSCC-96" else field44
+        for part, (_, cp_len, ref_bits, ref_len) in enumerate(table):
+            rows = valid & (header == code) & (partition == part)
+            if not rows.any():
+                continue
+            scheme[rows] = name
+            company[rows] = field[rows] >> np.uint64(ref_bits)
+            reference[rows] = field[rows] & np.uint64((1 << ref_bits) - 1)
+            cp_digits[rows] = cp_len
+            ref_digits[rows] = ref_len
+            if name != "SSCC-96":
+                serial[rows] = serial38[rows].astype(np.int64)
+
+    decoded = pd.DataFrame({
+        "Scheme": scheme,
+        "Header": np.where(valid, _HEADER_TEXT[header], ""),
+        "Filter": pd.array(np.where(scheme != "Unknown", filt, -1), dtype="Int64"),
+        "Company Prefix": _pad_digits(company, cp_digits),
+        "Item Reference": _pad_digits(reference, ref_digits),
+        "Serial": pd.array(serial, dtype="Int64"),
+    }, index=epcs.index)
+    decoded.loc[decoded["Filter"] < 0, "Filter"] = pd.NA
+    decoded.loc[decoded["Serial"] < 0, "Serial"] = pd.NA
+    return decoded
+
+
+def add_gs1_columns(df, epc_col="EPC"):
+    """Decode the EPC column and return df with GS1_COLUMNS added (replacing existing ones)"""
+    decoded = decode_epcs(df[epc_col])
+    return df.drop(columns=GS1_COLUMNS, errors="ignore").join(decoded)
+
+
+def filter_gs1(df, company_prefixes=None, item_references=None):
+    """Keep rows whose decoded company prefix / item reference is in the given lists"""
+    mask = pd.Series(True, index=df.index)
+    if company_prefixes:
+        mask &= df["Company Prefix"].isin(company_prefixes)
+    if item_references:
+        mask &= df["Item Reference"].isin(item_references)
+    return df[mask]
+
+
+def apply_gs1_stage(df, options, epc_col="EPC"):
+    """Decode GS1 fields and apply the company prefix / item reference filters"""
+    df = add_gs1_columns(df, epc_col)
+    return filter_gs1(df, options.get("company_prefixes"), options.get("item_references"))
+
+
+def summarize_products(df):
+    """Count unique EPCs per scheme / company prefix / item reference"""
+    keys = ["Scheme", "Company Prefix", "Item Reference"]
+    return (
+        df[df["Scheme"] != "Unknown"]
+        .groupby(keys, dropna=False)["EPC"]
+        .nunique()
+        .reset_index(name="Unique EPCs")
+        .sort_values(keys)
+    )
+
+
+def ask_gs1_options():
+    """Ask whether to decode GS1 fields and which company prefixes / item references to keep"""
+    root = tk.Tk()
+    root.attributes("-topmost", True)
+    root.withdraw()
+    if not messagebox.askyesno(
+        "Decode GS1",
+        "Decode EPCs into GS1 fields (SGTIN-96, SSCC-96, GRAI-96)?\n"
+        "Adds Scheme, Company Prefix, Item Reference and Serial columns."
+    ):
+        return None
+
+    def ask_list(title, prompt):
+        answer = simpledialog.askstring(title, prompt)
+        return [p.strip() for p in answer.split(",") if p.strip()] if answer else []
+
+    return {
+        "company_prefixes": ask_list("Filter by Company Prefix",
+                                     "Enter GS1 company prefix(es) to include (e.g. 0614141).\nLeave blank to keep all."),
+        "item_references": ask_list("Filter by Item Reference",
+                                    "Enter item reference(s) to include (e.g. 812345).\nLeave blank to keep all."),
+    }
@@ -0,0 +1,167 @@
+# EPC Stocktake History Store
+# Appends every merge / comparison run to a local SQLite database (indexed by EPC, run,
+# location and reader) and answers cross-run delta questions: newly found, newly missing, moved
+
+import os
+import sqlite3
+from datetime import datetime
+import pandas as pd
+import tkinter as tk
+from tkinter import simpledialog, messagebox
+
+HISTORY_DB = os.path.join("history", "stocktake_history.db")
+HISTORY_ENABLED = True  # Set to False to stop the tools from recording runs
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id     INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind       TEXT NOT NULL,
+    label      TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS reads (
+    run_id   INTEGER NOT NULL REFERENCES runs(run_id),
+    epc      TEXT NOT NULL,
+    location TEXT,
+    reader   TEXT,
+    found    INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_reads_run_epc ON reads(run_id, epc);
+CREATE INDEX IF NOT EXISTS idx_reads_epc ON reads(epc);
+CREATE INDEX IF NOT EXISTS idx_reads_location ON reads(location);
+CREATE INDEX IF NOT EXISTS idx_reads_reader ON reads(reader);
+"""
+
+# EPCs present in a run: every row of a merge run, found rows of a comparison run
+PRESENT_SQL = "SELECT epc, location, reader FROM reads WHERE run_id = ? AND COALESCE(found, 1) = 1"
+
+
+def open_history(db_path=HISTORY_DB):
+    """Open (and create if needed) the history database"""
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def record_run(kind, label, df, db_path=HISTORY_DB):
+    """
+    Append one run to the history store. df needs an EPC column and may have
+    Location, Reader and Found ("Yes"/"No") columns. Returns the new run id.
+    """
+    rows = pd.DataFrame({
+        "epc": df["EPC"].astype(str),
+        "location": df["Location"] if "Location" in df.columns else None,
+        "reader": df["Reader"] if "Reader" in df.columns else None,
+        "found": df["Found"].eq("Yes").astype(int) if "Found" in df.columns else None,
+    })
+
+    conn = open_history(db_path)
+    try:
+        with conn:
+            cur = conn.execute(
+                "INSERT INTO runs (kind, label, created_at) VALUES (?, ?, ?)",
+                (kind, label, datetime.now().isoformat(timespec="seconds"))
+            )
+            run_id = cur.lastrowid
+            rows.insert(0, "run_id", run_id)
+            rows.to_sql("reads", conn, if_exists="append", index=False, chunksize=50000)
+        print(f"🗃️ Recorded {kind} run #{run_id} ({len(rows)} rows) in {db_path}")
+        return run_id
+    finally:
+        conn.close()
+
+
+def try_record_run(kind, label, df, db_path=HISTORY_DB):
+    """record_run for the tools: never lets a history problem fail the run itself"""
+    if not HISTORY_ENABLED:
+        return None
+    try:
+        return record_run(kind, label, df, db_path)
+    except Exception as e:
+        print(f"⚠️ Could not record run in history: {e}")
+        return None
+
+
+def list_runs(db_path=HISTORY_DB):
+    """All recorded runs with their row counts, newest first"""
+    conn = open_history(db_path)
+    try:
+        return pd.read_sql_query(
+            """
+            SELECT r.run_id, r.kind, r.label, r.created_at, COUNT(x.epc) AS rows
+            FROM runs r LEFT JOIN reads x ON x.run_id = r.run_id
+            GROUP BY r.run_id ORDER BY r.run_id DESC
+            """,
+            conn
+        )
+    finally:
+        conn.close()
+
+
+def run_deltas(run_a, run_b, db_path=HISTORY_DB):
+    """
+    Compare two runs. Returns {sheet name: DataFrame} with EPCs newly found in run_b,
+    newly missing in run_b (present in run_a only) and moved (location changed).
+    """
+    conn = open_history(db_path)
+    try:
+        conn.execute("DROP TABLE IF EXISTS temp.a")
+        conn.execute("DROP TABLE IF EXISTS temp.b")
+        conn.execute(f"CREATE TEMP TABLE a AS {PRESENT_SQL}", (run_a,))
+        conn.execute(f"CREATE TEMP TABLE b AS {PRESENT_SQL}", (run_b,))
+        conn.execute("CREATE INDEX temp.idx_a ON a(epc)")
+        conn.execute("CREATE INDEX temp.idx_b ON b(epc)")
+
+        newly_found = pd.read_sql_query(
+            "SELECT b.* FROM b WHERE NOT EXISTS (SELECT 1 FROM a WHERE a.epc = b.epc) ORDER BY b.epc", conn)
+        newly_missing = pd.read_sql_query(
+            "SELECT a.* FROM a WHERE NOT EXISTS (SELECT 1 FROM b WHERE b.epc = a.epc) ORDER BY a.epc", conn)
+        moved = pd.read_sql_query(
+            """
+            SELECT a.epc, a.location AS location_before, b.location AS location_after,
+                   a.reader AS reader_before, b.reader AS reader_after
+            FROM a JOIN b ON a.epc = b.epc
+            WHERE COALESCE(a.location, '') <> COALESCE(b.location, '')
+            ORDER BY a.epc
+            """,
+            conn
+        )
+    finally:
+        conn.close()
+
+    return {"Newly Found": newly_found, "Newly Missing": newly_missing, "Moved": moved}
+
+
+def export_deltas(run_a, run_b, db_path=HISTORY_DB):
+    """Write the run_a -> run_b deltas to an Excel file next to the database"""
+    deltas = run_deltas(run_a, run_b, db_path)
+    output_file = os.path.join(os.path.dirname(db_path) or ".", f"Delta_Run{run_a}_to_Run{run_b}.xlsx")
+    with pd.ExcelWriter(output_file) as writer:
+        pd.DataFrame([
+            {"Delta": name, "EPCs": len(df)} for name, df in deltas.items()
+        ]).to_excel(writer, sheet_name="Summary", index=False)
+        for name, df in deltas.items():
+            df.to_excel(writer, sheet_name=name, index=False)
+    print(f"📄 Delta file saved: {output_file}")
+    return output_file
+
+
+if __name__ == "__main__":
+    print("🗃️ EPC Stocktake History")
+    runs = list_runs()
+    if runs.empty:
+        print("❌ No runs recorded yet.")
+    else:
+        print(runs.to_string(index=False))
+
+        root = tk.Tk()
+        root.attributes("-topmost", True)
+        root.withdraw()
+        run_a = simpledialog.askinteger("Compare Runs", "Enter the EARLIER run id (see console list):")
+        run_b = simpledialog.askinteger("Compare Runs", "Enter the LATER run id:") if run_a else None
+        if run_a and run_b:
+            output_file = export_deltas(run_a, run_b)
+            messagebox.showinfo("Delta Complete", f"Run deltas saved to:\n{output_file}")
+        else:
+            print("❌ Cancelled.")
@@ -0,0 +1,58 @@
+# EPC Dominant Location Resolver
+# Picks one most-likely location per EPC (most reads, then strongest average RSSI,
+# then latest file) with grouped pandas operations instead of per-EPC Python
+
+import numpy as np
+import pandas as pd
+
+RSSI_RANGE = (-120, 0)    # Plausible RSSI values in dBm
+RSSI_MIN_SHARE = 0.9      # Share of values that must fall in RSSI_RANGE
+
+
+def detect_rssi_column(df, exclude=()):
+    """
+    Guess the RSSI column of a raw scan DataFrame: a numeric column whose values
+    are almost all negative dBm readings. Returns the column label or None.
+    """
+    best_col, best_share = None, 0.0
+    for col in df.columns:
+        if col in exclude:
+            continue
+        values = pd.to_numeric(df[col], errors="coerce").dropna()
+        if values.empty or (values == 0).all():
+            continue
+        share = values.between(*RSSI_RANGE).mean()
+        if share >= RSSI_MIN_SHARE and share > best_share:
+            best_col, best_share = col, share
+    return best_col
+
+
+def explode_joined(df, col, sep=","):
+    """Split comma-joined values ("A, B") into one row each, dropping blanks and Unknown"""
+    parts = df.assign(**{col: df[col].astype(str).str.split(sep)}).explode(col)
+    parts[col] = parts[col].str.strip()
+    return parts[(parts[col] != "") & (parts[col].str.lower() != "unknown") & (parts[col].str.lower() != "nan")]
+
+
+def dominant_values(df, value_col="Location", key_col="EPC", weight_col=None, rssi_col=None, order_col=None):
+    """
+    Resolve one value per key. Each row votes for its value with weight_col
+    (default 1 per row, i.e. read counts); ties go to the higher mean RSSI,
+    then to the highest order_col (e.g. latest file). Returns a Series key -> value.
+    """
+    work = pd.DataFrame({
+        key_col: df[key_col],
+        value_col: df[value_col],
+        "_weight": pd.to_numeric(df[weight_col], errors="coerce").fillna(1) if weight_col in df else 1,
+        "_rssi": pd.to_numeric(df[rssi_col], errors="coerce") if rssi_col in df else np.nan,
+        "_order": df[order_col] if order_col in df else 0,
+    })
+
+    votes = (
+        work.groupby([key_col, value_col], sort=False, observed=True)
+        .agg(_weight=("_weight", "sum"), _rssi=("_rssi", "mean"), _order=("_order", "max"))
+        .reset_index()
+        .sort_values([key_col, "_weight", "_rssi", "_order"],
+                     ascending=[True, False, False, False], na_position="last")
+    )
+    return votes.drop_duplicates(key_col).set_index(key_col)[value_col]
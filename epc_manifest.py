@@ -0,0 +1,117 @@
+# EPC Metadata Manifest
+# A sidecar file that maps folders / file name patterns to Reader and Location, so scan files
+# do not have to be renamed to Reader_Location_N. The mergers look for a manifest next to the
+# selected files or in any parent folder, resolve it once per batch and fall back to the
+# file name for files it does not cover.
+#
+# epc_manifest.csv                         epc_manifest.json
+#   pattern,reader,location                  [{"pattern": "DockA/*", "reader": "R1", "location": "Dock A"},
+#   DockA/*,R1,Dock A                         {"pattern": "*_shelf*.csv", "location": "Shelves"}]
+#   *_shelf*.csv,,Shelves
+#
+# Patterns are globs matched against the path relative to the manifest folder, the file name
+# or any parent folder ("DockA" covers everything below DockA). Reader and Location are taken
+# from the first matching row that fills them, so specific rows go above general ones.
+
+import os
+import re
+import json
+import fnmatch
+from pathlib import Path
+import pandas as pd
+
+MANIFEST_NAMES = ("epc_manifest.csv", "epc_manifest.json")
+MANIFEST_FIELDS = {"reader": "Reader", "location": "Location"}
+
+
+def find_manifest(files):
+    """Nearest manifest in the folder of the files or one of its parents, or None"""
+    if not files:
+        return None
+    folder = Path(os.path.commonpath([str(Path(file).resolve().parent) for file in files]))
+    for candidate in [folder, *folder.parents]:
+        for name in MANIFEST_NAMES:
+            if (candidate / name).exists():
+                return candidate / name
+    return None
+
+
+def load_manifest(path):
+    """Read a manifest into a list of (compiled pattern, {"Reader": ..., "Location": ...}) rules"""
+    path = Path(path)
+    if path.suffix.lower() == ".json":
+        with open(path, "r", encoding="utf-8") as f:
+            rows = json.load(f)
+        if isinstance(rows, dict):
+            rows = [{"pattern": pattern, **values} for pattern, values in rows.items()]
+        rows = pd.DataFrame(rows)
+    else:
+        rows = pd.read_csv(path, dtype=str, skipinitialspace=True)
+    rows.columns = [str(c).strip().lower() for c in rows.columns]
+    if "pattern" not in rows.columns:
+        raise ValueError(f"{path.name} needs a 'pattern' column")
+
+    rules = []
+    for row in rows.fillna("").astype(str).to_dict("records"):
+        pattern = row["pattern"].strip().replace("\\", "/").strip("/")
+        if not pattern:
+            continue
+        values = {field: row[key].strip() for key, field in MANIFEST_FIELDS.items() if row.get(key, "").strip()}
+        rules.append((re.compile(fnmatch.translate(pattern), re.IGNORECASE), values))
+    return rules
+
+
+def is_manifest(file):
+    """Manifest files sit among the scan files but are not scans"""
+    return Path(file).name.lower() in MANIFEST_NAMES
+
+
+def _candidates(file, base):
+    """Strings a pattern may match: relative path, file name and every parent folder"""
+    try:
+        relative = Path(file).resolve().relative_to(base)
+    except ValueError:
+        relative = Path(Path(file).name)
+    folders = [Path(*relative.parts[:i]).as_posix() for i in range(1, len(relative.parts))]
+    return [relative.as_posix(), relative.name, *folders]
+
+
+def resolve_manifest(files, path=None):
+    """
+    Resolve Reader / Location for every file once: {file: {"Reader": ..., "Location": ...}}.
+    Uses the given manifest or the nearest one; returns None when there is none.
+    """
+    path = Path(path) if path else find_manifest(files)
+    if path is None:
+        return None
+    try:
+        rules = load_manifest(path)
+    except Exception as e:
+        print(f"⚠️ Ignoring unreadable manifest {path}: {e}")
+        return None
+
+    base = path.resolve().parent
+    metadata = {}
+    for file in files:
+        candidates = _candidates(file, base)
+        values = {}
+        for regex, row in rules:
+            if any(regex.match(c) for c in candidates):
+                values = {**row, **values}
+        metadata[file] = values
+    covered = sum(1 for values in metadata.values() if values)
+    print(f"🗺️ Manifest {path.name}: metadata for {covered}/{len(files)} files")
+    return metadata
+
+
+def file_metadata(file, metadata, fields):
+    """
+    Reader / Location for one file: the manifest values, with the file name
+    (Reader_Location_N or Location_N, given as fields in segment order) as fallback
+    """
+    values = (metadata or {}).get(file, {})
+    segments = Path(file).stem.split("_")
+    return {
+        field: values.get(field) or (segments[i] if i < len(segments) else "Unknown")
+        for i, field in enumerate(fields)
+    }
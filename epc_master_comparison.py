@@ -2,14 +2,46 @@
 # Adds "Location Found" and "Reader Used" columns to outputs
 
 import pandas as pd
+import numpy as np
 import os
 import sys
+import queue
+import pickle
+import fnmatch
+import itertools
+import threading
 from pathlib import Path
 import tkinter as tk
 from tkinter import filedialog, simpledialog, messagebox
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from epc_history import try_record_run
+from epc_location_resolver import explode_joined, dominant_values
+from epc_parquet_export import ask_parquet_export, export_parquet_dataset
+from epc_prefix_match import build_match_index, match_epcs
+from epc_duplicates import duplicate_report, print_duplicate_summary
+from epc_checkpoint import Checkpoint, checkpoint_key, file_fingerprint
+from epc_csv_backend import read_csv, read_csv_header
+from epc_pool_workers import init_compare_worker, compare_worker
+from concurrent.futures.process import BrokenProcessPool
 
 EXCEL_MAX_ROWS = 1048576  # Excel row limit
+MAX_WORKERS = max(1, (os.cpu_count() or 2) - 1)  # Master files parsed in parallel
+WRITER_QUEUE_SIZE = 4  # Compared files waiting to be written (bounds memory)
+
+EPC_SAMPLE_ROWS = 200  # Rows sampled per sheet when detecting the EPC column
+PARQUET_FOLDER = os.path.join("comparison_results", "parquet")  # Stable, so reruns replace partitions
+BREAKDOWN_SCAN_COLUMNS = ["Location Found", "Reader Used"]  # Always broken down in the summary
+
+# Output modes: which master rows are written to the compared files
+OUTPUT_MODES = {
+    "1": ("all", "Full master with Found / Location Found / Reader Used"),
+    "2": ("not_found", "Only EPCs NOT found (rescan list)"),
+    "3": ("found", "Only EPCs found"),
+    "4": ("none", "Summary only (no compared files)"),
+}
+
+_match_index = {}   # Sorted scan EPCs for prefix / key matching (with the scan index they belong to), built once per process
 
 def select_files_and_folders(title):
     root = tk.Tk()
@@ -42,13 +74,21 @@ def select_files_and_folders(title):
 
     return list(files)
 
+SCAN_INDEX_COLUMNS = ["Location", "All Locations", "Reader"]
+
 def load_merged_epcs(files):
-    """Load EPCs from merged files with Location and Reader info"""
-    merged_data = {}
-    for file in files:
+    """Load EPCs from merged files into a scan index (EPC -> Location, All Locations, Reader)"""
+    return build_scan_index(read_merged_frames(files))
+
+def read_merged_frames(files):
+    """Read merged files as scan frames (EPC, Location, All Locations, Reader, Read Count, File Order)"""
+    frames = []
+    for file_order, file in enumerate(files):
         try:
             if file.lower().endswith(".csv"):
-                df = pd.read_csv(file)
+                # Only the columns the scan index uses
+                wanted = ["EPC"] + SCAN_INDEX_COLUMNS + ["Read Count"]
+                df = read_csv(file, usecols=[c for c in read_csv_header(file) if c in wanted])
             else:
                 df = pd.read_excel(file)
 
@@ -57,15 +97,52 @@ def load_merged_epcs(files):
                 continue
 
             df["EPC"] = df["EPC"].astype(str).str.strip()
-            for _, row in df.iterrows():
-                epc = row["EPC"]
-                location = row.get("Location", "")
-                reader = row.get("Reader", "")
-                merged_data[epc] = {"Location": location, "Reader": reader}
+            df = df.reindex(columns=["EPC", "Location", "All Locations", "Reader", "Read Count"])
+            df["File Order"] = file_order
+            frames.append(df)
 
         except Exception as e:
             print(f"❌ Error reading {file}: {e}")
-    return merged_data
+
+    return frames
+
+def build_scan_index(frames):
+    """
+    Scan index from merged DataFrames (EPC, Location, All Locations, Reader, Read Count,
+    File Order), whether read from files or handed over in memory by the pipeline
+    """
+    if not frames:
+        return pd.DataFrame(columns=SCAN_INDEX_COLUMNS, index=pd.Index([], name="EPC"))
+
+    scans = pd.concat(frames, ignore_index=True)
+    scans["All Locations"] = scans["All Locations"].fillna(scans["Location"])
+    for col in SCAN_INDEX_COLUMNS:
+        scans[col] = scans[col].fillna("").astype(str)
+
+    # EPCs seen once map straight through; repeated EPCs combine their metadata,
+    # keeping the dominant location (most reads, then latest file) as Location
+    repeated = scans["EPC"].duplicated(keep=False)
+    if repeated.any():
+        print(f"🔁 {scans.loc[repeated, 'EPC'].nunique()} EPCs appear more than once — combining Location/Reader.")
+    combined = (
+        scans[repeated]
+        .groupby("EPC")
+        .agg({"All Locations": join_unique, "Reader": join_unique})
+    )
+    votes = explode_joined(scans[repeated], "Location")
+    dominant = dominant_values(votes, "Location", weight_col="Read Count", order_col="File Order")
+    combined["Location"] = dominant.reindex(combined.index).fillna("")
+
+    scan_index = pd.concat([
+        scans[~repeated].set_index("EPC")[SCAN_INDEX_COLUMNS],
+        combined[SCAN_INDEX_COLUMNS],
+    ])
+    return scan_index
+
+def join_unique(values):
+    """Combine comma-separated values into one sorted, de-duplicated string"""
+    parts = {p.strip() for val in values for p in str(val).split(",")}
+    return ", ".join(sorted(p for p in parts if p and p.lower() != "unknown"))
 
 def auto_adjust_columns(file_path):
     """Auto-adjust column widths for Excel file"""
@@ -74,18 +151,18 @@ def auto_adjust_columns(file_path):
         from openpyxl.utils import get_column_letter
 
         wb = openpyxl.load_workbook(file_path)
-        ws = wb.active
-
-        for col in ws.columns:
-            max_length = 0
-            column = col[0].column  # 1-based index
-            for cell in col:
-                try:
-                    if cell.value:
-                        max_length = max(max_length, len(str(cell.value)))
-                except:
-                    pass
-            ws.column_dimensions[get_column_letter(column)].width = max_length + 2
+
+        for ws in wb.worksheets:
+            for col in ws.columns:
+                max_length = 0
+                column = col[0].column  # 1-based index
+                for cell in col:
+                    try:
+                        if cell.value:
+                            max_length = max(max_length, len(str(cell.value)))
+                    except:
+                        pass
+                ws.column_dimensions[get_column_letter(column)].width = max_length + 2
 
         wb.save(file_path)
         print(f"📏 Auto-adjusted columns: {file_path}")
@@ -93,51 +170,437 @@ def auto_adjust_columns(file_path):
     except Exception as e:
         print(f"⚠️ Could not auto-adjust columns for {file_path}: {e}")
 
-def process_master_file(master_file, merged_epcs, output_folder, summary_rows, totals):
-    """Compare a single master file and save result"""
-    try:
-        if master_file.lower().endswith(".csv"):
-            df = pd.read_csv(master_file)
-        else:
-            df = pd.read_excel(master_file)
-
-        if "EPC" not in df.columns:
-            print(f"⚠️ Skipping {master_file} — no EPC column found.")
+def list_master_sheets(master_file, include=None, exclude=None):
+    """
+    List the sheets of a master workbook, keeping names that match any include
+    pattern and none of the exclude patterns (case-insensitive, * wildcards).
+    CSV files have a single unnamed sheet (None).
+    """
+    if master_file.lower().endswith(".csv"):
+        return [None]
+
+    sheets = pd.ExcelFile(master_file).sheet_names
+    if include:
+        sheets = [s for s in sheets if any(fnmatch.fnmatch(s.lower(), p.lower()) for p in include)]
+    if exclude:
+        sheets = [s for s in sheets if not any(fnmatch.fnmatch(s.lower(), p.lower()) for p in exclude)]
+    return sheets
+
+def build_master_tasks(master_files, include=None, exclude=None):
+    """Expand master files into (file, sheet, tag_sheet) tasks, one per selected sheet"""
+    tasks = []
+    for master_file in master_files:
+        try:
+            sheets = list_master_sheets(master_file, include, exclude)
+        except Exception as e:
+            print(f"❌ Error reading {master_file}: {e}")
+            continue
+        if not sheets:
+            print(f"⚠️ Skipping {master_file} — no sheets match the sheet filter.")
+        for sheet in sheets:
+            tasks.append((master_file, sheet, len(sheets) > 1))
+    return tasks
+
+def read_master_file(master_file, sheet=None):
+    """Read one sheet of a master database file (CSV or Excel)"""
+    if master_file.lower().endswith(".csv"):
+        return read_csv(master_file)
+    return pd.read_excel(master_file, sheet_name=sheet if sheet is not None else 0)
+
+def detect_epc_column(df):
+    """
+    Find the EPC column: an exact "EPC" header, then a header containing "epc",
+    then the column with the most EPC-like values (alnum, 16+ chars, not all digits).
+    """
+    if "EPC" in df.columns:
+        return "EPC"
+    for col in df.columns:
+        if "epc" in str(col).lower():
+            return col
+
+    best_col, best_score = None, 0
+    sample = df.head(EPC_SAMPLE_ROWS)
+    for col in sample.columns:
+        values = sample[col].dropna().astype(str).str.strip()
+        score = int((values.str.isalnum() & (values.str.len() >= 16) & ~values.str.isdigit()).sum())
+        if score > best_score:
+            best_col, best_score = col, score
+    return best_col
+
+def get_match_index(scan_index, key_length=None):
+    """Sorted scan EPCs for prefix / key matching, cached per scan index"""
+    # The cache keeps the scan index itself, so a new frame can never be mistaken for it
+    cached = _match_index.get("scan_index")
+    if cached is not scan_index or _match_index.get("key_length") != key_length:
+        _match_index.clear()
+        _match_index.update(scan_index=scan_index, key_length=key_length,
+                            index=build_match_index(scan_index.index.to_numpy(), key_length))
+    return _match_index["index"]
+
+def compare_master_df(df, scan_index, match=None):
+    """
+    Add Found / Location Found / Reader Used columns to a master DataFrame.
+    match = {"mode": "prefix"} or {"mode": "key", "key_length": N} also matches
+    truncated against full EPCs and adds Matched EPC / Match Type / Match Candidates.
+    """
+    df["EPC"] = df["EPC"].astype(str).str.strip()
+    mode = (match or {}).get("mode", "exact")
+    if mode == "exact":
+        lookup = df["EPC"]
+        df["Found"] = np.where(df["EPC"].isin(scan_index.index), "Yes", "No")
+    else:
+        index = get_match_index(scan_index, match.get("key_length") if mode == "key" else None)
+        matched, candidates, kind = match_epcs(df["EPC"].to_numpy(), index)
+        lookup = pd.Series(matched, index=df.index)
+        df["Found"] = np.where(candidates > 0, "Yes", "No")
+        df["Matched EPC"] = matched
+        df["Match Type"] = np.where(candidates > 1, "Ambiguous", np.where(candidates > 0, kind, "Not Found"))
+        df["Match Candidates"] = candidates
+    df["Location Found"] = lookup.map(scan_index["Location"]).fillna("")
+    df["All Locations Found"] = lookup.map(scan_index["All Locations"]).fillna("")
+    df["Reader Used"] = lookup.map(scan_index["Reader"]).fillna("")
+    return df
+
+def matched_epcs(df):
+    """The scanned EPC each compared master row matched ("" if not found)"""
+    if "Matched EPC" in df.columns:
+        return df["Matched EPC"].fillna("").astype(str).to_numpy()
+    return df["EPC"].where(df["Found"].eq("Yes"), "").to_numpy()
+
+def project_result(df, output):
+    """
+    Reduce a compared master DataFrame to what the output mode needs:
+    only found / not-found rows and only the chosen columns (EPC always kept).
+    Returns None when no compared file should be written.
+    """
+    rows = (output or {}).get("rows", "all")
+    columns = (output or {}).get("columns")
+    if rows == "none":
+        return None
+    if rows == "found":
+        df = df[df["Found"] == "Yes"]
+    elif rows == "not_found":
+        df = df[df["Found"] == "No"]
+    if columns:
+        keep = ["EPC"] + [c for c in columns if c in df.columns and c != "EPC"]
+        df = df[keep]
+    return df.reset_index(drop=True)
+
+def coverage_breakdowns(df, columns):
+    """
+    Found counts grouped by each column, in one groupby per column.
+    Returns {column: DataFrame indexed by value with Total Rows / EPCs Found}.
+    """
+    found = df["Found"].eq("Yes")
+    breakdowns = {}
+    for col in columns:
+        if col not in df.columns:
+            continue
+        blank = "(not found)" if col in BREAKDOWN_SCAN_COLUMNS else "(blank)"
+        keys = df[col].fillna("").astype(str).str.strip().replace("", blank)
+        breakdowns[col] = (
+            found.groupby(keys, sort=False).agg(["size", "sum"])
+            .rename(columns={"size": "Total Rows", "sum": "EPCs Found"})
+        )
+    return breakdowns
+
+def merge_breakdowns(parts):
+    """Add up per-sheet breakdowns into {column: DataFrame}"""
+    merged = {}
+    for breakdowns in parts:
+        for col, counts in breakdowns.items():
+            merged.setdefault(col, []).append(counts)
+    return {col: pd.concat(counts).groupby(level=0).sum() for col, counts in merged.items()}
+
+def breakdown_sheets(parts):
+    """Summary sheets ("By <column>") from per-sheet breakdowns, lowest coverage first"""
+    sheets = {}
+    for col, counts in merge_breakdowns(parts).items():
+        table = counts.rename_axis(col).reset_index()
+        table["EPCs Not Found"] = table["Total Rows"] - table["EPCs Found"]
+        percent = table["EPCs Found"] / table["Total Rows"] * 100
+        table = table.assign(_percent=percent).sort_values(["_percent", "Total Rows"], ascending=[True, False])
+        table["% Found"] = table.pop("_percent").map(lambda p: f"{p:.2f}%")
+        sheets[f"By {col}"[:31]] = table.reset_index(drop=True)
+    return sheets
+
+def load_and_compare_master(master_file, sheet, tag_sheet, scan_index, output=None):
+    """
+    Parse one master sheet and compare it. Returns None if no EPC column is found,
+    otherwise a result dict with row counts, the master EPCs, coverage breakdowns
+    and the projected output.
+    """
+    df = read_master_file(master_file, sheet)
+    source = f"{master_file} [{sheet}]" if tag_sheet else master_file
+
+    epc_col = detect_epc_column(df)
+    if epc_col is None:
+        print(f"⚠️ Skipping {source} — no EPC column found.")
+        return None
+    if epc_col != "EPC":
+        print(f"🔎 Using column '{epc_col}' as EPC in {source}")
+        df = df.rename(columns={epc_col: "EPC"})
+
+    if tag_sheet:
+        df["Master Sheet"] = sheet
+    df = compare_master_df(df, scan_index, (output or {}).get("match"))
+    breakdown_columns = BREAKDOWN_SCAN_COLUMNS + (output or {}).get("breakdowns", [])
+    if "Match Type" in df.columns:
+        breakdown_columns.append("Match Type")
+    return {
+        "total_rows": len(df),
+        "found_rows": int(df["Found"].eq("Yes").sum()),
+        "duplicate_rows": int(df["EPC"].duplicated().sum()),
+        "epcs": df["EPC"].to_numpy(),
+        "matched": matched_epcs(df),
+        "breakdowns": coverage_breakdowns(df, breakdown_columns),
+        "df": project_result(df, output),
+    }
+
+def combine_results(results):
+    """Combine the results of several sheets into one logical master result"""
+    dfs = [r["df"] for r in results if r["df"] is not None]
+    epcs = np.concatenate([r["epcs"] for r in results])
+    matched = np.concatenate([r["matched"] for r in results])
+    return {
+        "total_rows": sum(r["total_rows"] for r in results),
+        "found_rows": sum(r["found_rows"] for r in results),
+        "duplicate_rows": int(pd.Series(epcs).duplicated().sum()),
+        "epcs": epcs,
+        "matched": matched,
+        "breakdowns": merge_breakdowns([r["breakdowns"] for r in results]),
+        "df": pd.concat(dfs, ignore_index=True) if dfs else None,
+    }
+
+def compare_master_files(tasks, scan_index, output=None):
+    """
+    Parse and compare master sheets in a process pool, one task per sheet.
+    Yields (master_file, sheet, result, error) in the same order as tasks,
+    so summary rows come out the same on every run. Falls back to
+    in-process comparison if the pool cannot be started.
+    """
+    done = 0
+    if MAX_WORKERS > 1 and len(tasks) > 1:
+        try:
+            workers = min(MAX_WORKERS, len(tasks))
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_compare_worker,
+                                     initargs=(scan_index, output)) as pool:
+                for result, error in pool.map(compare_worker, tasks):
+                    yield tasks[done][0], tasks[done][1], result, error
+                    done += 1
             return
+        except (BrokenProcessPool, pickle.PicklingError, OSError) as e:
+            print(f"⚠️ Parallel comparison unavailable ({e}), continuing in this process.")
 
-        df["EPC"] = df["EPC"].astype(str).str.strip()
-        df["Found"] = df["EPC"].apply(lambda x: "Yes" if x in merged_epcs else "No")
-        df["Location Found"] = df["EPC"].apply(lambda x: merged_epcs[x]["Location"] if x in merged_epcs else "")
-        df["Reader Used"] = df["EPC"].apply(lambda x: merged_epcs[x]["Reader"] if x in merged_epcs else "")
-
-        found_count = df["Found"].eq("Yes").sum()
-        total_rows = len(df)
-        percent_found = (found_count / total_rows) * 100 if total_rows else 0
-
-        # Update totals
-        totals["total_rows"] += total_rows
-        totals["found_rows"] += found_count
+    for task in tasks[done:]:
+        try:
+            yield task[0], task[1], load_and_compare_master(*task, scan_index, output), None
+        except Exception as e:
+            yield task[0], task[1], None, str(e)
+
+def comparison_checkpoint(scan_index, output):
+    """Checkpoint for one scan index + output settings: a rerun with the same inputs resumes it"""
+    scan_hash = int(pd.util.hash_pandas_object(scan_index, index=True).to_numpy().sum())
+    return Checkpoint(f"comparison_{checkpoint_key(len(scan_index), scan_hash, output)}")
+
+def compare_with_checkpoint(tasks, scan_index, output=None, checkpoint=None):
+    """
+    compare_master_files, but master sheets already compared in an earlier (interrupted)
+    run are loaded from the checkpoint and newly compared ones are saved to it.
+    Yields in task order, like compare_master_files.
+    """
+    if checkpoint is None:
+        yield from compare_master_files(tasks, scan_index, output)
+        return
 
-        # Save result file
-        base_name = Path(master_file).stem
-        output_file = os.path.join(output_folder, f"{base_name}_Compared.xlsx")
+    keys = [checkpoint_key(file_fingerprint(file), sheet) for file, sheet, _ in tasks]
+    # A sheet listed twice is compared once; later copies are served from the checkpoint
+    pending, queued = [], set()
+    for task, key in zip(tasks, keys):
+        if key not in checkpoint and key not in queued:
+            pending.append(task)
+            queued.add(key)
+    resumed = sum(key in checkpoint for key in keys)
+    if resumed:
+        print(f"♻️ Resuming: {resumed} of {len(tasks)} master sheets already compared.")
+
+    fresh = compare_master_files(pending, scan_index, output)
+    for task, key in zip(tasks, keys):
+        if key in queued:
+            # First occurrence of a pending sheet: fresh yields these in the same order
+            queued.discard(key)
+            file, sheet, result, error = next(fresh)
+        else:
+            result = checkpoint.load(key)
+            if result is not None:
+                yield task[0], task[1], result, None
+                continue
+            file, sheet, result, error = next(compare_master_files([task], scan_index, output))
+        if result is not None:
+            checkpoint.save(key, result)
+        yield file, sheet, result, error
+
+def save_result_file(df, output_file, parquet=None):
+    """
+    Save a result DataFrame as Excel, or CSV when it exceeds the Excel row limit.
+    parquet = (dataset folder, partition columns) also writes a partitioned Parquet dataset.
+    """
+    if parquet:
+        export_parquet_dataset(df, parquet[0], parquet[1], missing_value="Not Found")
+    if len(df) > EXCEL_MAX_ROWS:
+        output_file = os.path.splitext(output_file)[0] + ".csv"
+        df.to_csv(output_file, index=False)
+        print(f"📁 Dataset too large for Excel. Saved as CSV: {output_file}")
+    else:
         df.to_excel(output_file, index=False)
         auto_adjust_columns(output_file)
-        print(f"✅ Saved: {output_file} ({found_count}/{total_rows} found)")
+        print(f"📁 Output saved as Excel: {output_file}")
+    return output_file
+
+def start_output_writer():
+    """Start a background thread that writes queued (df, output_file, parquet) jobs"""
+    jobs = queue.Queue(maxsize=WRITER_QUEUE_SIZE)
+
+    def writer():
+        while True:
+            job = jobs.get()
+            if job is None:
+                break
+            df, output_file, parquet = job
+            try:
+                save_result_file(df, output_file, parquet)
+            except Exception as e:
+                print(f"❌ Error saving {output_file}: {e}")
+
+    thread = threading.Thread(target=writer, daemon=True)
+    thread.start()
+    return jobs, thread
+
+def stop_output_writer(jobs, thread):
+    """Wait for all queued outputs to be written"""
+    jobs.put(None)
+    thread.join()
+
+def process_master_file(base_name, result, output_folder, summary_rows, totals, jobs, parquet_cols=None):
+    """Record a compared master file (or sheet) and queue its output for saving"""
+    found_count = result["found_rows"]
+    total_rows = result["total_rows"]
+    percent_found = (found_count / total_rows) * 100 if total_rows else 0
+
+    # Update totals
+    totals["total_rows"] += total_rows
+    totals["found_rows"] += found_count
+    totals["duplicate_rows"] += result["duplicate_rows"]
+
+    # Queue result file (skipped in summary-only mode)
+    if result["df"] is not None:
+        output_file = os.path.join(output_folder, f"{base_name}_Compared.xlsx")
+        parquet = (os.path.join(PARQUET_FOLDER, base_name), parquet_cols) if parquet_cols else None
+        jobs.put((result["df"], output_file, parquet))
+    print(f"✅ Compared: {base_name} ({found_count}/{total_rows} found)")
 
-        summary_rows.append({
-            "Master File": base_name,
-            "Total Rows": total_rows,
-            "EPCs Found": found_count,
-            "EPCs Not Found": total_rows - found_count,
-            "% Found": f"{percent_found:.2f}%"
-        })
+    summary_rows.append({
+        "Master File": base_name,
+        "Total Rows": total_rows,
+        "EPCs Found": found_count,
+        "EPCs Not Found": total_rows - found_count,
+        "% Found": f"{percent_found:.2f}%",
+        "Duplicate Rows": result["duplicate_rows"],
+    })
 
-    except Exception as e:
-        print(f"❌ Error processing {master_file}: {e}")
+def source_label(master_file, sheet, multi_sheet_files):
+    """Name of a master file, or of one of its sheets when the workbook has several"""
+    return f"{Path(master_file).stem} [{sheet}]" if master_file in multi_sheet_files else Path(master_file).stem
+
+def save_duplicate_report(master_sources, merged_sources, output_folder):
+    """
+    Duplicate EPCs within and across master files / sheets and merged files.
+    Writes the duplicated EPCs to Duplicate_EPCs.xlsx and returns the per-source summary sheets.
+    """
+    sheets, duplicate_lists = {}, []
+    for name, sources in (("Master", master_sources), ("Merged", merged_sources)):
+        if not sources:
+            continue
+        per_source, duplicates = duplicate_report(sources)
+        print_duplicate_summary(f"{name} files", per_source, duplicates)
+        sheets[f"{name} Duplicates"] = per_source
+        if not duplicates.empty:
+            duplicate_lists.append(duplicates.assign(**{"Checked In": name}))
+
+    if duplicate_lists:
+        save_result_file(pd.concat(duplicate_lists, ignore_index=True),
+                         os.path.join(output_folder, "Duplicate_EPCs.xlsx"))
+    return sheets
+
+def master_matches(master_epcs, matched=None):
+    """
+    One row per unique master EPC with the scanned EPC it matched ("" if none), sorted by EPC.
+    matched is aligned with master_epcs (the compared results' "matched"); without it
+    master EPCs are matched exactly. An EPC listed several times is found if any row was.
+    """
+    master = pd.DataFrame({"EPC": master_epcs, "Matched EPC": master_epcs if matched is None else matched})
+    master = master.astype(str)
+    return (
+        master.sort_values("Matched EPC", ascending=False)
+        .drop_duplicates("EPC")
+        .sort_values("EPC")
+        .reset_index(drop=True)
+    )
+
+def reconcile_epcs(master_epcs, scan_index, matched=None):
+    """
+    Reconcile master EPCs against the scan index, following the comparison's matches
+    (exact, prefix or key) when matched is given. Returns (found, missing, unexpected):
+    found and missing are master EPCs (found with the matched scan's metadata),
+    unexpected are scanned EPCs that no master EPC matched, with their metadata.
+    """
+    master = master_matches(master_epcs, matched)
+    if matched is None:
+        master["Matched EPC"] = master["EPC"].where(master["EPC"].isin(scan_index.index), "")
+    hit = master["Matched EPC"] != ""
+
+    found = master[hit].merge(scan_index, left_on="Matched EPC", right_index=True, how="left")
+    if matched is None:
+        found = found.drop(columns="Matched EPC")
+    found = found.reset_index(drop=True)
+    missing = master.loc[~hit, ["EPC"]].reset_index(drop=True)
+    scans = scan_index.reset_index()
+    unexpected = scans[~scans["EPC"].isin(master.loc[hit, "Matched EPC"])].sort_values("EPC").reset_index(drop=True)
+    return found, missing, unexpected
+
+def save_reconciliation(master_epcs, scan_index, output_folder, matched=None):
+    """Write the unexpected-tags list and return a reconciliation summary sheet"""
+    found, missing, unexpected = reconcile_epcs(master_epcs, scan_index, matched)
+    print(f"🧾 Reconciliation: {len(found)} found, {len(missing)} missing, {len(unexpected)} unexpected")
+
+    if not unexpected.empty:
+        save_result_file(unexpected, os.path.join(output_folder, "Unexpected_Tags.xlsx"))
+
+    return pd.DataFrame([
+        {"Category": "Found (in master and scanned)", "Unique EPCs": len(found)},
+        {"Category": "Missing (in master, not scanned)", "Unique EPCs": len(missing)},
+        {"Category": "Unexpected (scanned, not in master)", "Unique EPCs": len(unexpected)},
+    ])
+
+def build_history_frame(master_epcs, scan_index, matched=None):
+    """
+    One row per unique master EPC with Found / Location / Reader, for the history store.
+    matched (aligned with master_epcs) carries prefix / key matches; exact otherwise.
+    """
+    epcs = pd.Series(pd.unique(master_epcs), name="EPC")
+    if matched is None:
+        lookup = epcs.where(epcs.isin(scan_index.index), "")
+    else:
+        lookup = epcs.map(master_matches(master_epcs, matched).set_index("EPC")["Matched EPC"])
+    return pd.DataFrame({
+        "EPC": epcs,
+        "Found": np.where(lookup != "", "Yes", "No"),
+        "Location": lookup.map(scan_index["Location"]),
+        "Reader": lookup.map(scan_index["Reader"]),
+    })
 
-def save_summary_file(summary_rows, totals, output_folder):
-    """Save summary Excel file"""
+def save_summary_file(summary_rows, totals, output_folder, extra_sheets=None):
+    """Save summary Excel file, with any extra {sheet name: DataFrame} sheets"""
     if totals["total_rows"] > 0:
         overall_percent = (totals["found_rows"] / totals["total_rows"]) * 100
     else:
@@ -149,21 +612,71 @@ def save_summary_file(summary_rows, totals, output_folder):
         "Total Rows": totals["total_rows"],
         "EPCs Found": totals["found_rows"],
         "EPCs Not Found": totals["total_rows"] - totals["found_rows"],
-        "% Found": f"{overall_percent:.2f}%"
+        "% Found": f"{overall_percent:.2f}%",
+        "Duplicate Rows": totals.get("duplicate_rows", 0),
     })
 
     summary_df = pd.DataFrame(summary_rows)
     summary_file = os.path.join(output_folder, "Master_Database_Comparison_Summary.xlsx")
-    summary_df.to_excel(summary_file, index=False)
+    with pd.ExcelWriter(summary_file) as writer:
+        summary_df.to_excel(writer, sheet_name="Summary", index=False)
+        for sheet_name, sheet_df in (extra_sheets or {}).items():
+            sheet_df.to_excel(writer, sheet_name=sheet_name, index=False)
     auto_adjust_columns(summary_file)
     print(f"📄 Summary file saved: {summary_file}")
 
+def ask_output_mode():
+    """Ask which rows and columns go into the compared output files, and the summary breakdowns"""
+    prompt = "Choose output mode:\n" + "\n".join(
+        f"{key} = {label}" for key, (_, label) in OUTPUT_MODES.items()
+    ) + "\n\nLeave blank for full output."
+    choice = simpledialog.askstring("Output Mode", prompt)
+    rows = OUTPUT_MODES.get((choice or "1").strip(), OUTPUT_MODES["1"])[0]
+
+    columns = None
+    if rows != "none":
+        answer = simpledialog.askstring(
+            "Output Columns",
+            "Enter column(s) to write (e.g. EPC, Description, Found, Location Found).\n"
+            "EPC is always included. Leave blank to write all columns:"
+        )
+        columns = [c.strip() for c in answer.split(",") if c.strip()] if answer else None
+
+    answer = simpledialog.askstring(
+        "Summary Breakdowns",
+        "Enter master column(s) to break coverage down by in the summary (e.g. Department, Category).\n"
+        "Location Found and Reader Used are always included. Leave blank for none:"
+    )
+    breakdowns = [c.strip() for c in answer.split(",") if c.strip()] if answer else []
+
+    return {"rows": rows, "columns": columns, "breakdowns": breakdowns, "match": ask_match_mode()}
+
+def ask_match_mode():
+    """Ask how master EPCs are matched to scanned EPCs"""
+    choice = simpledialog.askstring(
+        "EPC Matching",
+        "Choose EPC matching:\n"
+        "1 = exact EPC\n"
+        "2 = prefix (truncated EPCs match full EPCs, e.g. 24 vs 32 characters)\n"
+        "3 = first N characters only\n\n"
+        "Leave blank for exact matching."
+    )
+    choice = (choice or "1").strip()
+    if choice == "2":
+        return {"mode": "prefix"}
+    if choice == "3":
+        key_length = simpledialog.askinteger("EPC Matching", "Number of characters to match on (e.g. 24):", minvalue=1)
+        if key_length:
+            return {"mode": "key", "key_length": key_length}
+    return {"mode": "exact"}
+
 def compare_epcs(merged_files, master_files):
     # Load merged EPCs with metadata
-    merged_epcs = load_merged_epcs(merged_files)
+    merged_frames = read_merged_frames(merged_files)
+    merged_epcs = build_scan_index(merged_frames)
     print(f"📦 Total unique EPCs from merged files: {len(merged_epcs)}")
 
-    if not merged_epcs:
+    if merged_epcs.empty:
         print("❌ No EPCs loaded from merged files.")
         return
 
@@ -177,6 +690,67 @@ def compare_epcs(merged_files, master_files):
         "Do you want to merge all master files into one (Yes) or process them separately (No)?"
     )
 
+    # Enumerate master sheets; only ask about sheets when a workbook has several
+    tasks = build_master_tasks(master_files)
+    per_sheet = False
+    if any(tag_sheet for _, _, tag_sheet in tasks):
+        include = simpledialog.askstring(
+            "Master Sheets",
+            "Some master workbooks have several sheets.\n"
+            "Enter sheet name(s) to include (e.g. Building*, Stock), or leave blank for all:"
+        )
+        exclude = simpledialog.askstring(
+            "Master Sheets",
+            "Enter sheet name(s) to exclude (e.g. Summary, Notes), or leave blank:"
+        )
+        include = [p.strip() for p in include.split(",") if p.strip()] if include else None
+        exclude = [p.strip() for p in exclude.split(",") if p.strip()] if exclude else None
+        tasks = build_master_tasks(master_files, include, exclude)
+        if not merge_choice:
+            per_sheet = messagebox.askyesno(
+                "Sheet Mode",
+                "Compare each sheet as its own master (Yes) or each workbook as one master (No)?"
+            )
+
+    output = ask_output_mode()
+    parquet_cols = ask_parquet_export("Location Found", "Reader Used") if output["rows"] != "none" else None
+
+    reconcile_choice = messagebox.askyesno(
+        "Reconciliation",
+        "Also list scanned EPCs that are not in any master file (unexpected tags)?"
+    )
+
+    output_folder = run_comparison(merged_epcs, tasks, {
+        "merge": merge_choice,
+        "per_sheet": per_sheet,
+        "output": output,
+        "parquet_cols": parquet_cols,
+        "reconcile": reconcile_choice,
+        "merged_sources": [(Path(merged_files[frame["File Order"].iat[0]]).stem, frame["EPC"].to_numpy())
+                           for frame in merged_frames if len(frame)],
+    })
+
+    # Popup summary
+    messagebox.showinfo(
+        "Comparison Complete",
+        f"Comparison complete!\nResults saved to:\n{output_folder}"
+    ) 
+
+def run_comparison(merged_epcs, tasks, options):
+    """
+    Compare master tasks against a scan index and write all outputs.
+    options: merge (one combined master), per_sheet, output (ask_output_mode dict),
+    parquet_cols, reconcile, merged_sources ([(label, EPCs)] per merged file, for the
+    duplicate report), checkpoint (default on: compared sheets are kept until the run
+    finishes, so an interrupted run resumes). Returns the output folder.
+    """
+    merge_choice = options.get("merge", False)
+    per_sheet = options.get("per_sheet", False)
+    output = options.get("output") or {"rows": "all", "columns": None, "breakdowns": []}
+    parquet_cols = options.get("parquet_cols")
+    reconcile_choice = options.get("reconcile", False)
+    checkpoint = comparison_checkpoint(merged_epcs, output) if options.get("checkpoint", True) else None
+
     # Prepare output folder
     os.makedirs("comparison_results", exist_ok=True)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -184,51 +758,42 @@ def compare_epcs(merged_files, master_files):
     os.makedirs(output_folder, exist_ok=True)
 
     summary_rows = []
-    totals = {"total_rows": 0, "found_rows": 0}
+    totals = {"total_rows": 0, "found_rows": 0, "duplicate_rows": 0}
+    master_sources = []  # (file / sheet label, EPCs) for the duplicate report
+    master_matched = []  # Scanned EPC each master row matched, aligned with master_sources
+    breakdown_parts = []
+    extra_sheets = {}
 
     if merge_choice:
         # Merge all master files into one DataFrame
+        multi_sheet_files = {file for file, _, tag_sheet in tasks if tag_sheet}
         dfs = []
-        for file in master_files:
-            try:
-                if file.lower().endswith(".csv"):
-                    df = pd.read_csv(file)
-                else:
-                    df = pd.read_excel(file)
-
-                if "EPC" not in df.columns:
-                    print(f"⚠️ Skipping {file} — no EPC column found.")
-                    continue
-
-                df["EPC"] = df["EPC"].astype(str).str.strip()
-                df["Found"] = df["EPC"].apply(lambda x: "Yes" if x in merged_epcs else "No")
-
-                df["Location Found"] = df["EPC"].apply(lambda x: merged_epcs[x]["Location"] if x in merged_epcs else "")
-                df["Reader Used"] = df["EPC"].apply(lambda x: merged_epcs[x]["Reader"] if x in merged_epcs else "")
-
-                found_in_file = df["Found"].eq("Yes").sum()
-                totals["total_rows"] += len(df)
-                totals["found_rows"] += found_in_file
-
-                dfs.append(df)
-                print(f"🔍 Compared {file}: {found_in_file}/{len(df)} found")
+        for file, sheet, result, error in compare_with_checkpoint(tasks, merged_epcs, output, checkpoint):
+            if error:
+                print(f"❌ Error reading {file}: {error}")
+                continue
+            if result is None:
+                continue
 
-            except Exception as e:
-                print(f"❌ Error reading {file}: {e}")
+            master_sources.append((source_label(file, sheet, multi_sheet_files), result["epcs"]))
+            master_matched.append(result["matched"])
+            breakdown_parts.append(result["breakdowns"])
+            found_in_file = result["found_rows"]
+            totals["total_rows"] += result["total_rows"]
+            totals["found_rows"] += found_in_file
+            totals["duplicate_rows"] += result["duplicate_rows"]
 
-        if dfs:
-            combined_master = pd.concat(dfs, ignore_index=True)
+            if result["df"] is not None:
+                dfs.append(result["df"])
+            print(f"🔍 Compared {file}: {found_in_file}/{result['total_rows']} found")
 
+        if totals["total_rows"]:
             # Save as Excel or CSV based on row limit
-            if len(combined_master) > EXCEL_MAX_ROWS:
-                output_file = os.path.join(output_folder, "Master_Comparison_Combined.csv")
-                combined_master.to_csv(output_file, index=False)
-                print(f"📁 Dataset too large for Excel. Saved as CSV: {output_file}")
-            else:
+            if dfs:
+                combined_master = pd.concat(dfs, ignore_index=True)
                 output_file = os.path.join(output_folder, "Master_Comparison_Combined.xlsx")
-                combined_master.to_excel(output_file, index=False)
-                auto_adjust_columns(output_file)
-                print(f"📁 Output saved as Excel: {output_file}")
+                parquet = (os.path.join(PARQUET_FOLDER, "Master_Comparison_Combined"), parquet_cols) if parquet_cols else None
+                save_result_file(combined_master, output_file, parquet)
 
             percent_found = (totals["found_rows"] / totals["total_rows"]) * 100 if totals["total_rows"] else 0
             summary_rows.append({
@@ -236,24 +801,55 @@ def compare_epcs(merged_files, master_files):
                 "Total Rows": totals["total_rows"],
                 "EPCs Found": totals["found_rows"],
                 "EPCs Not Found": totals["total_rows"] - totals["found_rows"],
-                "% Found": f"{percent_found:.2f}%"
+                "% Found": f"{percent_found:.2f}%",
+                "Duplicate Rows": totals["duplicate_rows"],
             })
         else:
             print("❌ No valid master files to merge.")
 
     else:
-        # Process each master file separately
-        for file in master_files:
-            process_master_file(file, merged_epcs, output_folder, summary_rows, totals)
+        # Process each master file separately; parsing runs in a process pool
+        # while finished results are written by a background thread
+        multi_sheet_files = {file for file, _, tag_sheet in tasks if tag_sheet}
+        jobs, writer = start_output_writer()
+        try:
+            results = compare_with_checkpoint(tasks, merged_epcs, output, checkpoint)
+            for file, file_results in itertools.groupby(results, key=lambda r: r[0]):
+                sheet_results = []
+                for _, sheet, result, error in file_results:
+                    if error:
+                        print(f"❌ Error processing {file} [{sheet}]: {error}")
+                    elif result is not None:
+                        master_sources.append((source_label(file, sheet, multi_sheet_files), result["epcs"]))
+                        master_matched.append(result["matched"])
+                        breakdown_parts.append(result["breakdowns"])
+                        if per_sheet and file in multi_sheet_files:
+                            base_name = f"{Path(file).stem}_{sheet}"
+                            process_master_file(base_name, result, output_folder, summary_rows, totals, jobs, parquet_cols)
+                        else:
+                            sheet_results.append(result)
+
+                # Sheets of one workbook are compared as one logical master
+                if sheet_results:
+                    result = combine_results(sheet_results)
+                    process_master_file(Path(file).stem, result, output_folder, summary_rows, totals, jobs, parquet_cols)
+        finally:
+            stop_output_writer(jobs, writer)
+
+    extra_sheets.update(breakdown_sheets(breakdown_parts))
+    extra_sheets.update(save_duplicate_report(master_sources, options.get("merged_sources"), output_folder))
+    all_master_epcs = np.concatenate([epcs for _, epcs in master_sources]) if master_sources else None
+    all_matched = np.concatenate(master_matched) if master_matched else None
+    if reconcile_choice and all_master_epcs is not None:
+        extra_sheets["Reconciliation"] = save_reconciliation(all_master_epcs, merged_epcs, output_folder, all_matched)
+    if all_master_epcs is not None:
+        try_record_run("comparison", output_folder, build_history_frame(all_master_epcs, merged_epcs, all_matched))
 
     # Save summary
-    save_summary_file(summary_rows, totals, output_folder)
-
-    # Popup summary
-    messagebox.showinfo(
-        "Comparison Complete",
-        f"Comparison complete!\nResults saved to:\n{output_folder}"
-    ) 
+    save_summary_file(summary_rows, totals, output_folder, extra_sheets)
+    if checkpoint is not None:
+        checkpoint.clear()
+    return output_folder
 
 def show_loading_popup():
     popup = tk.Toplevel()
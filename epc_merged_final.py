@@ -1,10 +1,16 @@
 import pandas as pd
 import os
 import tkinter as tk
-from tkinter import filedialog, simpledialog
+from tkinter import filedialog, simpledialog, messagebox
 from datetime import datetime
 import threading
 import subprocess
+from epc_history import try_record_run
+from epc_location_resolver import explode_joined, dominant_values
+from epc_gs1 import GS1_COLUMNS, ask_gs1_options, apply_gs1_stage, summarize_products
+from epc_parquet_export import ask_parquet_export, export_parquet_dataset
+from epc_dtypes import as_epc_strings, to_categories, concat_compact
+from epc_filter import compile_filter, parse_terms
 
 def select_excel_files():
     root = tk.Tk()
@@ -44,15 +50,25 @@ def merge_cleaned_files(files):
     root.attributes("-topmost", True)
     root.withdraw()
 
-    # Prefix filter
+    # EPC filter (prefixes, hex ranges, lengths, regex)
     prefix_filters = []
     while True:
-        prefix = simpledialog.askstring("Filter EPCs", "Enter EPC prefix(es) to include (e.g. 01, 03).\nPress Enter without typing to finish.")
+        prefix = simpledialog.askstring(
+            "Filter EPCs",
+            "Enter EPC filter(s) to include: prefixes (e.g. 01, 03), hex ranges (30340000-3034FFFF),\n"
+            "lengths (len:24) or a regular expression (re:^3034).\nPress Enter without typing to finish."
+        )
         if prefix:
-            parts = [p.strip() for p in prefix.split(",") if p.strip()]
+            parts = parse_terms(prefix)
+            try:
+                compile_filter(parts)
+            except ValueError as e:
+                messagebox.showerror("Filter EPCs", str(e))
+                continue
             prefix_filters.extend(parts)
         else:
             break
+    epc_filter = compile_filter(prefix_filters)
 
     # Truncate EPC
     char_input = simpledialog.askstring("Truncate EPCs", "Enter number of characters to keep from each EPC (e.g. 24).\nLeave blank to use full EPCs:")
@@ -61,6 +77,10 @@ def merge_cleaned_files(files):
     except (TypeError, ValueError):
         char_limit = None
 
+    # Optional GS1 decoding / product filter
+    gs1_options = ask_gs1_options()
+    parquet_cols = ask_parquet_export("Location", "Reader")
+
     # Save name
     os.makedirs("merged_final", exist_ok=True)
     default_name = f"Final_Merged_EPCs_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
@@ -77,37 +97,46 @@ def merge_cleaned_files(files):
             dfs = []
             all_columns = set()
 
-            # Step 1: Collect all column names (except "File Name")
+            # Step 1: Collect all column names (except "File Name") from the header rows
             for file in files:
                 try:
-                    df = pd.read_excel(file)
+                    df = pd.read_excel(file, nrows=0)
                     if "EPC" not in df.columns:
                         print(f"❌ Skipping {file} — no EPC column found.")
                         continue
                     all_columns.update(col for col in df.columns if col != "File Name")
                 except Exception as e:
                     print(f"❌ Error reading {file}: {e}")
+            # Older merges only have Location (their full location list); keep it as All Locations
+            if "Location" in all_columns:
+                all_columns.add("All Locations")
 
             # Final column order
             all_columns = list(all_columns)
             all_columns = [col for col in all_columns if col != "EPC"]
             all_columns = ["EPC"] + sorted(all_columns, key=str.lower)
+            category_columns = [col for col in all_columns if col not in ("EPC", "Read Count", *GS1_COLUMNS)]
 
             # Step 2: Normalize and process each file
-            for file in files:
+            for file_order, file in enumerate(files):
                 try:
                     df = pd.read_excel(file)
 
                     if "EPC" not in df.columns:
                         continue
 
-                    df["EPC"] = df["EPC"].astype(str)
+                    df["EPC"] = as_epc_strings(df["EPC"])
 
                     if char_limit:
-                        df["EPC"] = df["EPC"].apply(lambda x: x[:char_limit] if len(x) > char_limit else x)
+                        df["EPC"] = df["EPC"].str[:char_limit]
 
-                    if prefix_filters:
-                        df = df[df["EPC"].str.startswith(tuple(prefix_filters))]
+                    # The filter applies to the (truncated) EPC, as in the mergers
+                    if epc_filter:
+                        df = df[epc_filter.mask(df["EPC"])]
+
+                    # Older merges have no "All Locations"; their Location is the full list
+                    if "Location" in df.columns and "All Locations" not in df.columns:
+                        df["All Locations"] = df["Location"]
 
                     for col in all_columns:
                         if col not in df.columns:
@@ -116,6 +145,11 @@ def merge_cleaned_files(files):
                             df[col] = df[col].fillna("Unknown")
 
                     df = df[all_columns]
+                    # Metadata text ("Unknown" fills included) is dictionary-encoded
+                    to_categories(df, category_columns)
+                    if gs1_options:
+                        df = apply_gs1_stage(df, gs1_options)
+                    df["File Order"] = file_order  # Later files win location ties
                     dfs.append(df)
 
                     print(f"✅ Loaded: {file} ({len(df)} rows after filtering)")
@@ -128,7 +162,7 @@ def merge_cleaned_files(files):
                 done_event.set()
                 return
 
-            combined = pd.concat(dfs, ignore_index=True)
+            combined = concat_compact(dfs, category_columns)
 
             # Merge duplicates by EPC
             def merge_column(series):
@@ -141,24 +175,44 @@ def merge_cleaned_files(files):
                 return ", ".join(unique_sorted) if unique_sorted else "Unknown"
 
 
+            # Files without read counts count as one read per EPC
+            if "Read Count" in combined.columns:
+                combined["Read Count"] = pd.to_numeric(combined["Read Count"], errors="coerce").fillna(1).astype(int)
+
             agg_dict = {col: merge_column for col in all_columns if col != "EPC"}
+            if "Read Count" in combined.columns:
+                agg_dict["Read Count"] = "sum"
+            # Decoded GS1 fields are the same for every row of an EPC
+            agg_dict.update({col: "first" for col in GS1_COLUMNS if col in combined.columns})
             merged = combined.groupby("EPC", as_index=False).agg(agg_dict)
 
+            # Single most-likely location per EPC: weighted by read counts, ties to the latest file
+            if "Location" in combined.columns:
+                votes = explode_joined(combined, "Location")
+                dominant = dominant_values(votes, "Location", weight_col="Read Count", order_col="File Order")
+                merged["Location"] = merged["EPC"].map(dominant).fillna("Unknown")
+
             # Save to Excel
             save_path = os.path.join("merged_final", f"{output_name}.xlsx")
-            merged.to_excel(save_path, index=False)
+            with pd.ExcelWriter(save_path) as writer:
+                merged.to_excel(writer, index=False)
+                if "Scheme" in merged.columns:
+                    summarize_products(merged).to_excel(writer, sheet_name="GS1 Products", index=False)
 
             # Auto-adjust column widths
             import openpyxl
             from openpyxl.utils import get_column_letter
             wb = openpyxl.load_workbook(save_path)
-            ws = wb.active
-            for col in ws.columns:
-                max_len = max((len(str(cell.value)) for cell in col if cell.value), default=0)
-                ws.column_dimensions[get_column_letter(col[0].column)].width = max_len + 2
+            for ws in wb.worksheets:
+                for col in ws.columns:
+                    max_len = max((len(str(cell.value)) for cell in col if cell.value), default=0)
+                    ws.column_dimensions[get_column_letter(col[0].column)].width = max_len + 2
             wb.save(save_path)
 
             print(f"✅ Final merged file saved to: {save_path}")
+            try_record_run("final_merge", save_path, merged)
+            if parquet_cols:
+                export_parquet_dataset(merged, os.path.join("merged_final", "parquet"), parquet_cols)
 
         finally:
             done_event.set()
@@ -7,8 +7,25 @@ import tkinter as tk
 from tkinter import filedialog, simpledialog, messagebox
 from tkinter import ttk
 import threading
+from concurrent.futures import ThreadPoolExecutor
+from epc_history import try_record_run
+from epc_location_resolver import detect_rssi_column, dominant_values
+from epc_parse_profile import load_parse_profile, read_with_profile
+from epc_gs1 import GS1_COLUMNS, ask_gs1_options, apply_gs1_stage, summarize_products
+from epc_parquet_export import ask_parquet_export, export_parquet_dataset
+from epc_dtypes import as_epc_strings, add_constant_columns, concat_compact
+from epc_quality_gate import ask_quality_rules, validate_epcs, save_rejects
+from epc_manifest import resolve_manifest, file_metadata, is_manifest
+from epc_checkpoint import Checkpoint, checkpoint_key, file_fingerprint
+from epc_partial_aggregate import build_partial, combine_partials, save_partial
+from epc_csv_backend import read_csv
+from epc_filter import compile_filter, parse_terms
 
 all_batches = []
+pending_batches = []  # Futures for batches still parsing in the background
+all_rejects = []  # Reads rejected by the quality gate, written at save time
+checkpoint = Checkpoint("merge_reader")  # Parsed batches of the current session, kept until the merge is saved
+batch_executor = ThreadPoolExecutor(max_workers=max(1, (os.cpu_count() or 2) - 1))
 
 def select_files_or_folder():
     root = tk.Tk()
@@ -21,7 +38,7 @@ def select_files_or_folder():
             file_paths = []
             for dirpath, _, filenames in os.walk(folder_path):
                 for filename in filenames:
-                    if filename.endswith((".xlsx", ".xls", ".csv")):
+                    if filename.endswith((".xlsx", ".xls", ".csv")) and not is_manifest(filename):
                         file_paths.append(os.path.join(dirpath, filename))
             return file_paths
         else:
@@ -33,27 +50,27 @@ def select_files_or_folder():
         )
         return list(file_paths)
 
-def read_file_flexible(file, nrows=None):
+def read_file_flexible(file, nrows=None, row_filter=None, filter_column=None):
     try:
-        with open(file, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-
         def is_epc_like(val):
             val = val.strip()
             return val.isalnum() and len(val) >= 16 and not val.isdigit()
 
         data_start_row = None
-        for i, line in enumerate(lines):
-            cells = line.strip().split(',')
-            if any(is_epc_like(cell) for cell in cells):
-                data_start_row = i
-                break
+        # Only the lines up to the first EPC row are read here
+        with open(file, 'r', encoding='utf-8') as f:
+            for i, line in enumerate(f):
+                cells = line.strip().split(',')
+                if any(is_epc_like(cell) for cell in cells):
+                    data_start_row = i
+                    break
 
         if data_start_row is None:
             print(f"❌ No EPC-like data found in {file}")
             return pd.DataFrame()
 
-        df = pd.read_csv(file, header=None, skiprows=data_start_row, on_bad_lines='skip', nrows=nrows)
+        df = read_csv(file, header=None, skiprows=data_start_row, nrows=nrows,
+                      row_filter=row_filter, filter_column=filter_column)
         return df
     except Exception as e:
         print(f"❌ Failed to read file {file}: {e}")
@@ -138,68 +155,167 @@ def choose_epc_column_gui_with_preview(df, filename):
     return col_index_map[selected_label]
 
 def load_batch(files):
-    preview_df = read_file_flexible(files[0], nrows=50)
-    preview_df = preview_df.dropna(axis=1, how='all').dropna(axis=0, how='all')
-    if preview_df.empty or len(preview_df.columns) == 0:
-        print(f"❌ No usable columns found in: {files[0]}")
-        return
+    # A parse profile from format_based_sorter fixes the layout for the whole group
+    profile = load_parse_profile(files)
+    if profile:
+        epc_index = profile["epc_column"]
+        print(f"🧾 Using parse profile for {Path(files[0]).parent.name} (EPC column {epc_index})")
+    else:
+        preview_df = read_file_flexible(files[0], nrows=50)
+        preview_df = preview_df.dropna(axis=1, how='all').dropna(axis=0, how='all')
+        if preview_df.empty or len(preview_df.columns) == 0:
+            print(f"❌ No usable columns found in: {files[0]}")
+            return
 
-    epc_index = choose_epc_column_gui_with_preview(preview_df, Path(files[0]).name)
+        epc_index = choose_epc_column_gui_with_preview(preview_df, Path(files[0]).name)
 
     root = tk.Tk()
     root.attributes("-topmost", True)
     root.withdraw()
     prefix_filters = []
     while True:
-        prefix = simpledialog.askstring("Filter EPCs", "Enter EPC prefix(es) to include (e.g. 01, 03). Leave blank to skip.")
+        prefix = simpledialog.askstring(
+            "Filter EPCs",
+            "Enter EPC filter(s) to include: prefixes (e.g. 01, 03), hex ranges (30340000-3034FFFF),\n"
+            "lengths (len:24) or a regular expression (re:^3034). Leave blank to skip."
+        )
         if prefix:
-            parts = [p.strip() for p in prefix.split(",") if p.strip()]
+            parts = parse_terms(prefix)
+            try:
+                compile_filter(parts)
+            except ValueError as e:
+                messagebox.showerror("Filter EPCs", str(e))
+                continue
             prefix_filters.extend(parts)
         else:
             break
 
     char_input = simpledialog.askstring("Truncate EPCs", "Enter number of characters to keep (e.g. 24), or leave blank:")
     char_limit = int(char_input) if char_input and char_input.isdigit() else None
+    gs1_options = ask_gs1_options()
+    quality_rules = ask_quality_rules()
+    metadata = resolve_manifest(files)  # Reader / Location from a sidecar manifest, if there is one
+
+    batch_key = checkpoint_key([file_fingerprint(f) for f in files], epc_index, prefix_filters, char_limit,
+                               gs1_options, quality_rules, metadata)
+    if any(key.endswith(batch_key) for key in checkpoint.keys()):
+        print("♻️ This batch was already parsed in the resumed merge — skipping.")
+        return
 
+    # Parse in the background so the operator can pick the next batch meanwhile
+    key = f"{len(all_batches) + len(pending_batches):05d}_{batch_key}"
+    pending_batches.append(batch_executor.submit(
+        checkpoint_batch, key, files, epc_index, prefix_filters, char_limit, gs1_options, profile, quality_rules, metadata
+    ))
+    print(f"⏳ Parsing {len(files)} files in the background...")
+
+def checkpoint_batch(key, *args):
+    """parse_batch, then keep the parsed batch (and its rejects) in the session checkpoint"""
+    rejects = []
+    merged_batch = parse_batch(*args, rejects=rejects)
+    all_rejects.extend(rejects)
+    if merged_batch is not None:
+        checkpoint.save(key, {"batch": merged_batch, "rejects": rejects})
+    return merged_batch
+
+def resume_checkpoint():
+    """Offer to reload the parsed batches of a merge that never got saved"""
+    keys = checkpoint.keys()
+    if not keys:
+        return
+    if not messagebox.askyesno(
+        "Resume Merge",
+        f"A previous merge stopped with {len(keys)} parsed batch(es) not yet saved.\n"
+        "Resume it (Yes) or start over (No)?"
+    ):
+        checkpoint.clear()
+        return
+    for key in keys:
+        saved = checkpoint.load(key)
+        if saved is not None:
+            all_batches.append(saved["batch"])
+            all_rejects.extend(saved["rejects"])
+    print(f"♻️ Resumed {len(all_batches)} parsed batches from {checkpoint.folder}")
+
+def raw_epc_column(file, epc_index, nrows=50):
+    """
+    Raw CSV column of the EPC column chosen by position among the non-empty columns
+    (found on a preview, like the column dialog); None if the preview has fewer columns
+    """
+    preview = read_file_flexible(file, nrows=nrows).dropna(axis=1, how='all')
+    return preview.columns[epc_index] if epc_index < len(preview.columns) else None
+
+def parse_batch(files, epc_index, prefix_filters, char_limit, gs1_options, profile=None, quality_rules=None,
+                metadata=None, rejects=None):
+    """Parse every file of a batch with the chosen options; runs on a worker thread"""
+    rejects = all_rejects if rejects is None else rejects
+    # Compiled once; terms that match the same reads before truncation are applied while
+    # files are read, the rest (len:, re:, terms longer than char_limit) after truncating
+    epc_filter = compile_filter(prefix_filters)
+    read_filter, truncated_filter = epc_filter.split(char_limit) if epc_filter else (None, None)
     batch_epcs = []
     skipped = []
 
     for file in files:
-        df = read_file_flexible(file)
-        df = df.dropna(axis=1, how='all').dropna(axis=0, how='all')
-
-        if epc_index >= len(df.columns):
-            print(f"❌ Skipped (column index out of range): {file}")
-            skipped.append(file)
+        if profile:
+            df = read_with_profile(file, profile, row_filter=read_filter)
+        else:
+            # With a filter, the chosen column is mapped to its raw CSV column so that
+            # non-matching rows are dropped while the file is read
+            selected_col = raw_epc_column(file, epc_index) if read_filter else None
+            pushed = selected_col is not None
+            df = read_file_flexible(file, row_filter=read_filter if pushed else None, filter_column=selected_col)
+            df = df.dropna(axis=1, how='all').dropna(axis=0, how='all')
+            if pushed and selected_col not in df.columns:
+                print(f"ℹ️ No reads match the EPC filter in: {file}")
+                continue
+            if not pushed:
+                if epc_index >= len(df.columns):
+                    print(f"❌ Skipped (column index out of range): {file}")
+                    skipped.append(file)
+                    continue
+                selected_col = df.columns[epc_index]
+                if read_filter:
+                    df = df[read_filter.mask(df[selected_col])]
+            rssi_col = detect_rssi_column(df, exclude=(selected_col,))
+            if rssi_col is None:
+                df = df[[selected_col]].dropna()
+                df.columns = ["EPC"]
+            else:
+                df = df[[selected_col, rssi_col]].dropna(subset=[selected_col])
+                df.columns = ["EPC", "RSSI"]
+
+        if df.empty and epc_filter:
+            print(f"ℹ️ No reads match the EPC filter in: {file}")
             continue
-
-        selected_col = df.columns[epc_index]
-        df = df[[selected_col]].dropna()
-        df.columns = ["EPC"]
-
         if df.empty:
             print(f"⚠️ Skipped (empty EPC column): {file}")
             skipped.append(file)
             continue
 
+        df["EPC"] = as_epc_strings(df["EPC"])
         if char_limit:
-            df["EPC"] = df["EPC"].astype(str).str[:char_limit]
-        if prefix_filters:
-            df = df[df["EPC"].str.startswith(tuple(prefix_filters))]
+            df["EPC"] = df["EPC"].str[:char_limit]
+        if truncated_filter:
+            df = df[truncated_filter.mask(df["EPC"])]
+            if df.empty:
+                print(f"ℹ️ No reads match the EPC filter in: {file}")
+                continue
+        if quality_rules:
+            df, rejected = validate_epcs(df, quality_rules)
+            rejects.append(rejected.assign(**{"File Name": Path(file).stem}))
+        if gs1_options:
+            df = apply_gs1_stage(df, gs1_options)
 
         file_stem = Path(file).stem
-        segments = file_stem.split("_")
-        reader = segments[0] if len(segments) >= 1 else "Unknown"
-        location = segments[1] if len(segments) >= 2 else "Unknown"
-
-        df["Reader"] = reader
-        df["Location"] = location
-        df["File Name"] = file_stem
+        # Dictionary-encoded: one category per file instead of a string per read
+        add_constant_columns(df, {**file_metadata(file, metadata, ("Reader", "Location")), "File Name": file_stem})
+        df["File Time"] = os.path.getmtime(file)
         batch_epcs.append(df)
 
+    merged_batch = None
     if batch_epcs:
-        merged_batch = pd.concat(batch_epcs, ignore_index=True)
-        all_batches.append(merged_batch)
+        merged_batch = concat_compact(batch_epcs)
         print(f"✅ Merged {len(batch_epcs)} files.")
     else:
         print("⚠️ No valid data found.")
@@ -209,6 +325,20 @@ def load_batch(files):
         for s in skipped:
             print(f" - {s}")
 
+    return merged_batch
+
+def collect_pending_batches():
+    """Wait for background batches (in submission order) and add them to all_batches"""
+    while pending_batches:
+        future = pending_batches.pop(0)
+        try:
+            merged_batch = future.result()
+        except Exception as e:
+            print(f"❌ Batch failed: {e}")
+            continue
+        if merged_batch is not None:
+            all_batches.append(merged_batch)
+
 def show_loading_popup():
     popup = tk.Toplevel()
     popup.title("Merging...")
@@ -227,47 +357,84 @@ def show_loading_popup():
     popup.update()
     return popup
 
+def aggregate_batches(batches):
+    """One row per EPC from parsed batches: joined Reader / Location / File Name, dominant Location, Read Count"""
+    merged_all = concat_compact(batches)
+
+    # Group by EPC and merge all unique values for Reader, Location, File Name
+    agg_columns = {
+        "Reader": lambda x: ", ".join(sorted(set(x))),
+        "Location": lambda x: ", ".join(sorted(set(x))),
+        "File Name": lambda x: ", ".join(sorted(set(x)))
+    }
+    # Decoded GS1 fields are the same for every read of an EPC
+    agg_columns.update({col: "first" for col in GS1_COLUMNS if col in merged_all.columns})
+    final_merged = (
+        merged_all.groupby("EPC")
+        .agg(agg_columns)
+        .reset_index()
+        .sort_values("EPC")
+    )
+
+    # Single most-likely location per EPC (most reads, then RSSI, then latest file);
+    # the full list stays in "All Locations"
+    dominant = dominant_values(merged_all, "Location", rssi_col="RSSI", order_col="File Time")
+    final_merged.insert(final_merged.columns.get_loc("Location") + 1, "All Locations", final_merged["Location"])
+    final_merged["Location"] = final_merged["EPC"].map(dominant)
+    final_merged["Read Count"] = final_merged["EPC"].map(merged_all.groupby("EPC").size())
+    return final_merged
+
+def write_merged_workbook(final_merged, filename):
+    """Save the merged EPCs (plus GS1 Products sheet when decoded) with auto-sized columns"""
+    with pd.ExcelWriter(filename) as writer:
+        final_merged.to_excel(writer, index=False)
+        if "Scheme" in final_merged.columns:
+            summarize_products(final_merged).to_excel(writer, sheet_name="GS1 Products", index=False)
+
+    try:
+        import openpyxl
+        from openpyxl.utils import get_column_letter
+        wb = openpyxl.load_workbook(filename)
+        for ws in wb.worksheets:
+            for col in ws.columns:
+                max_len = max((len(str(cell.value)) for cell in col if cell.value), default=0)
+                ws.column_dimensions[get_column_letter(col[0].column)].width = max_len + 2
+        wb.save(filename)
+        print(f"✅ File saved to: {filename}")
+    except Exception as e:
+        print(f"⚠️ Saved, but column auto-fit failed: {e}")
+
 def save_and_exit():
-    if not all_batches:
+    if not all_batches and not pending_batches:
         print("❌ No data merged.")
         return
 
+    parquet_cols = ask_parquet_export("Location", "Reader")
     popup = show_loading_popup()
     done_event = threading.Event()
 
     def merge_and_save():
         from datetime import datetime
-        merged_all = pd.concat(all_batches, ignore_index=True)
-
-        # Group by EPC and merge all unique values for Reader, Location, File Name
-        final_merged = (
-            merged_all.groupby("EPC")
-            .agg({
-                "Reader": lambda x: ", ".join(sorted(set(x))),
-                "Location": lambda x: ", ".join(sorted(set(x))),
-                "File Name": lambda x: ", ".join(sorted(set(x)))
-            })
-            .reset_index()
-            .sort_values("EPC")
-        )
-
-        os.makedirs("merged", exist_ok=True)
-        filename = f"merged/Merged_EPCs_Reader_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        final_merged.to_excel(filename, index=False)
-
         try:
-            import openpyxl
-            from openpyxl.utils import get_column_letter
-            wb = openpyxl.load_workbook(filename)
-            ws = wb.active
-            for col in ws.columns:
-                max_len = max((len(str(cell.value)) for cell in col if cell.value), default=0)
-                ws.column_dimensions[get_column_letter(col[0].column)].width = max_len + 2
-            wb.save(filename)
-            print(f"✅ File saved to: {filename}")
+            collect_pending_batches()
+            if not all_batches:
+                print("❌ No data merged.")
+                done_event.set()
+                return
+            final_merged = aggregate_batches(all_batches)
+
+            os.makedirs("merged", exist_ok=True)
+            filename = f"merged/Merged_EPCs_Reader_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+            write_merged_workbook(final_merged, filename)
+            save_partial(combine_partials(build_partial(b) for b in all_batches), Path(filename).stem)
+
+            try_record_run("merge", filename, final_merged)
+            save_rejects(all_rejects, label=Path(filename).stem)
+            if parquet_cols:
+                export_parquet_dataset(final_merged, os.path.join("merged", "parquet"), parquet_cols)
+            checkpoint.clear()  # Merge saved: nothing left to resume
         except Exception as e:
-            print(f"⚠️ Saved, but column auto-fit failed: {e}")
-
+            print(f"❌ Merge failed: {e}")
         done_event.set()
 
     threading.Thread(target=merge_and_save).start()
@@ -283,11 +450,12 @@ def save_and_exit():
 
 if __name__ == "__main__":
     print("📦 EPC Merger (Reader + Location mode, Smart EPC Detection)")
+    resume_checkpoint()
     while True:
         files = select_files_or_folder()
         if not files: break
         load_batch(files)
         if not messagebox.askyesno("More?", "Load another batch?"): break
-    if all_batches:
+    if all_batches or pending_batches:
         if messagebox.askyesno("Confirm Merge", "Merge all batches and save file?"):
             save_and_exit()
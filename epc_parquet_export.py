@@ -0,0 +1,77 @@
+# EPC Parquet Export
+# Writes merge / comparison results as a Parquet dataset partitioned by Location
+# (and optionally Reader), so BI tools can read only the partitions they need.
+# pyarrow is optional: without it the export is skipped with a warning.
+
+import os
+import pandas as pd
+from tkinter import messagebox
+
+STATS_FILE = "_partition_stats.json"  # Underscore files are ignored when the dataset is read
+
+
+def ask_parquet_export(location_col="Location", reader_col="Reader"):
+    """Ask whether to export a Parquet dataset; returns the partition columns or None"""
+    if not messagebox.askyesno(
+        "Parquet Export",
+        f"Also export a Parquet dataset partitioned by {location_col}?\n(for BI tools; needs pyarrow)"
+    ):
+        return None
+    partition_cols = [location_col]
+    if reader_col and messagebox.askyesno("Parquet Export", f"Also partition by {reader_col}?"):
+        partition_cols.append(reader_col)
+    return partition_cols
+
+
+def export_parquet_dataset(df, folder, partition_cols, missing_value="Unknown"):
+    """
+    Write df to folder as a hive-partitioned Parquet dataset (folder/Location=X/part-0.parquet)
+    with column statistics. Only the partitions present in df are replaced; other
+    partitions already in folder are left untouched. Returns the per-partition stats or None.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+    except ImportError:
+        print("⚠️ pyarrow is not installed, skipping Parquet export (pip install pyarrow).")
+        return None
+
+    partition_cols = [col for col in partition_cols if col in df.columns]
+    if not partition_cols:
+        print("⚠️ Partition column(s) not in the output, skipping Parquet export.")
+        return None
+
+    data = df.copy()
+    for col in data.columns:
+        if data[col].dtype == object:
+            # Excel masters mix numbers and text in one column; Arrow needs one type
+            data[col] = data[col].astype("string")
+    for col in partition_cols:
+        # As text first: a categorical column (the mergers' dtype) has no missing_value category
+        data[col] = data[col].astype("string").fillna(missing_value).replace("", missing_value)
+
+    table = pa.Table.from_pandas(data, preserve_index=False)
+    ds.write_dataset(
+        table, folder, format="parquet",
+        partitioning=partition_cols, partitioning_flavor="hive",
+        existing_data_behavior="delete_matching",
+        basename_template="part-{i}.parquet",
+        file_options=ds.ParquetFileFormat().make_write_options(compression="snappy", write_statistics=True),
+    )
+
+    stats = data.groupby(partition_cols, observed=True).size().rename("Rows").reset_index()
+    if "Found" in data.columns:
+        stats["EPCs Found"] = data["Found"].eq("Yes").groupby([data[c] for c in partition_cols]).sum().to_numpy()
+    stats_path = os.path.join(folder, STATS_FILE)
+    if os.path.exists(stats_path):
+        # Keep stats of partitions this run did not rewrite
+        previous = pd.read_json(stats_path, orient="records", dtype={col: str for col in partition_cols})
+        if list(previous.columns[:len(partition_cols)]) == partition_cols:
+            kept = previous.merge(stats[partition_cols], on=partition_cols, how="left", indicator=True)
+            previous = kept[kept.pop("_merge") == "left_only"]
+            stats = pd.concat([previous, stats], ignore_index=True)
+    stats = stats.sort_values(partition_cols).reset_index(drop=True)
+    stats.to_json(stats_path, orient="records", indent=2)
+
+    print(f"🧱 Parquet dataset saved: {folder} ({len(data)} rows, {len(stats)} partitions)")
+    return stats
@@ -0,0 +1,101 @@
+# EPC Parse Profiles
+# A parse profile records how files of one format group are laid out (delimiter, data start row,
+# EPC / RSSI / antenna columns) so the mergers can parse every file directly, without previews
+
+import csv
+import json
+from pathlib import Path
+import pandas as pd
+from epc_location_resolver import detect_rssi_column
+from epc_csv_backend import read_csv
+
+PROFILE_NAME = "parse_profile.json"
+SNIFF_LINES = 50      # Lines read to detect delimiter and data start row
+SAMPLE_ROWS = 200     # Data rows sampled to detect columns
+DELIMITERS = ",;\t|"
+
+
+def is_epc_like(val):
+    val = str(val).strip()
+    return val.isalnum() and len(val) >= 16 and not val.isdigit()
+
+
+def build_parse_profile(file_path, signature=None):
+    """Work out the layout of one scan file; returns a profile dict or None if no EPCs are found"""
+    with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+        head = [line for _, line in zip(range(SNIFF_LINES), f)]
+
+    try:
+        delimiter = csv.Sniffer().sniff("".join(head), delimiters=DELIMITERS).delimiter
+    except csv.Error:
+        # Preamble lines confuse the sniffer; fall back to the most frequent candidate
+        counts = {d: sum(line.count(d) for line in head) for d in DELIMITERS}
+        delimiter = max(counts, key=counts.get) if any(counts.values()) else ","
+
+    start_row = next(
+        (i for i, line in enumerate(head) if any(is_epc_like(c) for c in line.strip().split(delimiter))),
+        None
+    )
+    if start_row is None:
+        return None
+
+    sample = pd.read_csv(file_path, header=None, sep=delimiter, skiprows=start_row,
+                         nrows=SAMPLE_ROWS, on_bad_lines="skip")
+    scores = {col: int(sample[col].dropna().map(is_epc_like).sum()) for col in sample.columns}
+    epc_column = int(max(scores, key=scores.get))
+    rssi_column = detect_rssi_column(sample, exclude=(epc_column,))
+
+    # Header names (if the row above the data has them) help find the antenna column
+    antenna_column = None
+    if start_row > 0:
+        header = [c.strip().lower() for c in head[start_row - 1].strip().split(delimiter)]
+        antenna_column = next((i for i, name in enumerate(header) if "ant" in name), None)
+
+    return {
+        "signature": signature,
+        "delimiter": delimiter,
+        "start_row": start_row,
+        "epc_column": epc_column,
+        "rssi_column": int(rssi_column) if rssi_column is not None else None,
+        "antenna_column": antenna_column,
+        "source_file": Path(file_path).name,
+    }
+
+
+def save_parse_profile(folder, profile):
+    """Write a profile into a format-group folder"""
+    path = Path(folder) / PROFILE_NAME
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(profile, f, indent=2)
+    return path
+
+
+def load_parse_profile(files):
+    """Return the profile shared by all files (same folder with a profile), or None"""
+    folders = {Path(file).parent for file in files}
+    if len(folders) != 1:
+        return None
+    path = folders.pop() / PROFILE_NAME
+    if not path.exists():
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"⚠️ Ignoring unreadable parse profile {path}: {e}")
+        return None
+
+
+def read_with_profile(file, profile, nrows=None, row_filter=None):
+    """
+    Parse only the EPC (and RSSI) columns of a file using its profile; returns EPC[, RSSI].
+    row_filter (an EpcFilter) drops non-matching reads while the file is read.
+    """
+    columns = {profile["epc_column"]: "EPC"}
+    if profile.get("rssi_column") is not None:
+        columns[profile["rssi_column"]] = "RSSI"
+
+    df = read_csv(file, header=None, sep=profile["delimiter"], skiprows=profile["start_row"],
+                  usecols=list(columns), nrows=nrows, row_filter=row_filter, filter_column=profile["epc_column"])
+    df = df.rename(columns=columns)[list(columns.values())]
+    return df.dropna(subset=["EPC"])
@@ -0,0 +1,170 @@
+# EPC Partial Aggregates
+# Every merge also writes a partial aggregate next to its workbook: one row per
+# (EPC, field, value) with read counts, RSSI sum / count and latest file time. Partials from
+# several laptops combine in any order (sums and maxima only), and the combined partial gives
+# the same table as merging all the raw reads at once — without re-reading any Excel output.
+#
+#   python epc_partial_aggregate.py merged/partials/TeamA.parquet merged/partials/TeamB.parquet
+#   (no arguments: the partial files are picked with a dialog)
+
+import os
+import sys
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import tkinter as tk
+from tkinter import filedialog
+
+from epc_gs1 import GS1_COLUMNS, add_gs1_columns
+from epc_history import try_record_run
+
+PARTIAL_FOLDER = os.path.join("merged", "partials")
+METADATA_FIELDS = ["Reader", "Location", "File Name"]
+VOTE_AGGREGATES = {"Reads": "sum", "RSSI Sum": "sum", "RSSI Count": "sum", "Last Time": "max"}
+
+try:
+    import pyarrow  # noqa: F401
+    PARTIAL_EXTENSION = ".parquet"
+except ImportError:
+    PARTIAL_EXTENSION = ".pkl.gz"
+
+
+def build_partial(batch):
+    """Parsed batch (one row per read) -> partial aggregate, one row per (EPC, Field, Value)"""
+    work = pd.DataFrame({
+        "EPC": batch["EPC"].astype(str),
+        "_rssi": pd.to_numeric(batch["RSSI"], errors="coerce") if "RSSI" in batch else np.nan,
+        "_time": batch["File Time"] if "File Time" in batch else 0.0,
+    })
+    parts = []
+    for field in METADATA_FIELDS:
+        if field not in batch:
+            continue
+        part = (
+            work.assign(Value=batch[field].astype(str))
+            .groupby(["EPC", "Value"], sort=False, observed=True)
+            .agg(**{"Reads": ("_time", "size"), "RSSI Sum": ("_rssi", "sum"),
+                    "RSSI Count": ("_rssi", "count"), "Last Time": ("_time", "max")})
+            .reset_index()
+        )
+        part.insert(1, "Field", field)
+        parts.append(part)
+    partial = pd.concat(parts, ignore_index=True)
+    partial.attrs["gs1"] = any(col in batch.columns for col in GS1_COLUMNS)
+    return partial
+
+
+def combine_partials(partials):
+    """Combine partial aggregates; associative and order-independent"""
+    partials = [p for p in partials if p is not None and not p.empty]
+    gs1 = any(p.attrs.get("gs1") for p in partials)
+    combined = (
+        pd.concat([p.astype({"Field": str, "Value": str}) for p in partials], ignore_index=True)
+        .groupby(["EPC", "Field", "Value"], sort=False)
+        .agg(VOTE_AGGREGATES)
+        .reset_index()
+    )
+    combined.attrs["gs1"] = gs1
+    return combined
+
+
+def _joined(rows):
+    """EPC -> comma-joined sorted values (values are already unique per EPC)"""
+    return rows.sort_values(["EPC", "Value"]).groupby("EPC", sort=False)["Value"].agg(", ".join)
+
+
+def finalize_partial(partial):
+    """
+    Partial aggregate -> merged table with the mergers' columns: Reader (if present),
+    dominant Location (most reads, then strongest mean RSSI, then latest file),
+    All Locations, File Name, GS1 fields (if decoded) and Read Count
+    """
+    locations = partial[partial["Field"] == "Location"]
+    votes = locations.assign(_rssi=locations["RSSI Sum"] / locations["RSSI Count"].replace(0, np.nan))
+    dominant = (
+        votes.sort_values(["EPC", "Reads", "_rssi", "Last Time"],
+                          ascending=[True, False, False, False], na_position="last")
+        .drop_duplicates("EPC")
+        .set_index("EPC")["Value"]
+    )
+
+    merged = pd.DataFrame(index=pd.Index(sorted(locations["EPC"].unique()), name="EPC"))
+    if (partial["Field"] == "Reader").any():
+        merged["Reader"] = _joined(partial[partial["Field"] == "Reader"])
+    merged["Location"] = dominant
+    merged["All Locations"] = _joined(locations)
+    merged["File Name"] = _joined(partial[partial["Field"] == "File Name"])
+    merged = merged.reset_index()
+    if partial.attrs.get("gs1"):
+        merged = add_gs1_columns(merged)
+    merged["Read Count"] = merged["EPC"].map(locations.groupby("EPC")["Reads"].sum())
+    return merged
+
+
+def save_partial(partial, label, folder=PARTIAL_FOLDER):
+    """Write a partial aggregate (Parquet, or gzipped pickle without pyarrow); returns the path or None"""
+    try:
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"{label}{PARTIAL_EXTENSION}")
+        compact = partial.astype({"Field": "category", "Value": "category"})
+        compact.attrs = dict(partial.attrs)
+        if PARTIAL_EXTENSION == ".parquet":
+            compact.to_parquet(path, index=False)
+        else:
+            compact.to_pickle(path)
+        print(f"🧩 Partial aggregate saved: {path} ({len(partial)} rows)")
+        return path
+    except Exception as e:
+        print(f"⚠️ Partial aggregate not saved: {e}")
+        return None
+
+
+def load_partial(path):
+    partial = pd.read_parquet(path) if str(path).endswith(".parquet") else pd.read_pickle(path)
+    partial.attrs.setdefault("gs1", any(col in partial.columns for col in GS1_COLUMNS))
+    return partial
+
+
+def combine_partial_files(paths):
+    """Combine partial files into merged_final/; returns the workbook path or None"""
+    from epc_merger_reader import write_merged_workbook
+
+    partials = []
+    for path in paths:
+        try:
+            partials.append(load_partial(path))
+            print(f"✅ Loaded: {path}")
+        except Exception as e:
+            print(f"❌ Error reading {path}: {e}")
+    if not partials:
+        print("❌ No partial aggregates loaded.")
+        return None
+
+    combined = combine_partials(partials)
+    merged = finalize_partial(combined)
+
+    label = f"Merged_Final_Partials_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    os.makedirs("merged_final", exist_ok=True)
+    save_path = os.path.join("merged_final", f"{label}.xlsx")
+    write_merged_workbook(merged, save_path)
+    save_partial(combined, label)  # The combined partial can itself be combined again later
+    try_record_run("final_merge", save_path, merged)
+    return save_path
+
+
+if __name__ == "__main__":
+    print("🧩 Combine Partial Aggregates")
+    paths = sys.argv[1:]
+    if not paths:
+        root = tk.Tk()
+        root.attributes("-topmost", True)
+        root.withdraw()
+        paths = list(filedialog.askopenfilenames(
+            title="Select Partial Aggregate Files",
+            initialdir=PARTIAL_FOLDER if os.path.isdir(PARTIAL_FOLDER) else None,
+            filetypes=[("Partial aggregates", "*.parquet *.pkl.gz")]
+        ))
+    if not paths:
+        print("❌ No files selected.")
+        sys.exit(0)
+    combine_partial_files(paths)
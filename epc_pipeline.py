@@ -0,0 +1,170 @@
+# EPC Stocktake Pipeline
+# Runs sort -> merge -> compare in one process. Parsed batches, the merged EPC table and the
+# scan index are handed from stage to stage as DataFrames; only the deliverables (merged
+# workbook and comparison results) are written to disk.
+#
+#   python epc_pipeline.py --scans <folder> --masters m1.xlsx m2.xlsx [--naming reader|location]
+#                          [--sort] [--prefix 30,31,len:24] [--truncate 24] [--gs1] [--no-reconcile]
+#                          [--manifest epc_manifest.csv]
+#   (no arguments: folders, naming and masters are asked with dialogs)
+
+import os
+import sys
+import argparse
+from pathlib import Path
+from datetime import datetime
+import tkinter as tk
+from tkinter import filedialog, messagebox
+
+import epc_merger_reader
+import epc_merger_location
+from format_based_sorter import sort_folder
+from epc_parse_profile import load_parse_profile, is_epc_like
+from epc_history import try_record_run
+from epc_quality_gate import save_rejects
+from epc_manifest import resolve_manifest, is_manifest
+from epc_filter import compile_filter, parse_terms
+from epc_master_comparison import (
+    select_files_and_folders, build_master_tasks, build_scan_index, run_comparison, SCAN_INDEX_COLUMNS,
+)
+
+SCAN_EXTENSIONS = (".xlsx", ".xls", ".csv")
+
+
+def find_batches(scan_folder):
+    """One batch per folder (a FormatGroup after sorting), in a stable order"""
+    batches = {}
+    for dirpath, _, filenames in os.walk(scan_folder):
+        files = sorted(os.path.join(dirpath, f) for f in filenames
+                       if f.lower().endswith(SCAN_EXTENSIONS) and not is_manifest(f))
+        if files:
+            batches[dirpath] = files
+    return [batches[folder] for folder in sorted(batches)]
+
+
+def detect_epc_index(merger, files):
+    """EPC column for a batch: from its parse profile, else the most EPC-like preview column"""
+    profile = load_parse_profile(files)
+    if profile:
+        return profile["epc_column"], profile
+
+    preview = merger.read_file_flexible(files[0], nrows=50)
+    preview = preview.dropna(axis=1, how="all").dropna(axis=0, how="all")
+    if preview.empty:
+        return None, None
+    scores = [int(preview[col].dropna().map(is_epc_like).sum()) for col in preview.columns]
+    return scores.index(max(scores)), None
+
+
+def merge_stage(scan_folder, naming="reader", prefix_filters=None, char_limit=None, gs1_options=None,
+                manifest=None):
+    """Parse every batch and aggregate to one row per EPC; returns (merger module, merged DataFrame)"""
+    merger = epc_merger_reader if naming == "reader" else epc_merger_location
+    batches = []
+    for files in find_batches(scan_folder):
+        epc_index, profile = detect_epc_index(merger, files)
+        if epc_index is None:
+            print(f"⚠️ Skipping {Path(files[0]).parent.name} — no EPC-like data found.")
+            continue
+        batch = merger.parse_batch(files, epc_index, prefix_filters or [], char_limit, gs1_options, profile,
+                                   metadata=resolve_manifest(files, manifest))
+        if batch is not None:
+            batches.append(batch)
+
+    if not batches:
+        return merger, None
+    return merger, merger.aggregate_batches(batches)
+
+
+def to_scan_frame(final_merged):
+    """Merged table -> the frame build_scan_index expects, without a round trip through Excel"""
+    frame = final_merged.reindex(columns=["EPC"] + SCAN_INDEX_COLUMNS + ["Read Count"])
+    frame["EPC"] = frame["EPC"].astype(str).str.strip()
+    frame["File Order"] = 0
+    return frame
+
+
+def run_pipeline(scan_folder, master_files, naming="reader", sort=False, prefix_filters=None,
+                 char_limit=None, gs1_options=None, reconcile=True, manifest=None):
+    """Run the whole stocktake; returns (merged file, comparison folder or None)"""
+    if sort:
+        print("🗂 Stage 1/3: sorting files by format")
+        sort_folder(scan_folder)
+
+    print("📦 Stage 2/3: merging scan files")
+    merger, final_merged = merge_stage(scan_folder, naming, prefix_filters, char_limit, gs1_options, manifest)
+    if final_merged is None:
+        print("❌ No EPCs found in the scan files.")
+        return None, None
+
+    os.makedirs("merged", exist_ok=True)
+    mode = "Reader" if naming == "reader" else "LocationOnly"
+    merged_file = f"merged/Merged_EPCs_{mode}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    merger.write_merged_workbook(final_merged, merged_file)
+    try_record_run("merge", merged_file, final_merged)
+    save_rejects(merger.all_rejects, label=Path(merged_file).stem)
+
+    if not master_files:
+        return merged_file, None
+
+    print("🔍 Stage 3/3: comparing with master files")
+    scan_index = build_scan_index([to_scan_frame(final_merged)])
+    print(f"📦 Total unique EPCs handed to comparison: {len(scan_index)}")
+    output_folder = run_comparison(scan_index, build_master_tasks(master_files), {"reconcile": reconcile})
+    return merged_file, output_folder
+
+
+def ask_pipeline_inputs():
+    """Dialog version of the command line options"""
+    root = tk.Tk()
+    root.attributes("-topmost", True)
+    root.withdraw()
+    scan_folder = filedialog.askdirectory(title="Select Folder with Raw Scan Files")
+    if not scan_folder:
+        return None
+    naming = "reader" if messagebox.askyesno(
+        "File Names", "Are files named Reader_Location_N (Yes) or Location_N (No)?"
+    ) else "location"
+    sort = messagebox.askyesno("Sort by Format", "Sort the files into format groups first?")
+    master_files = select_files_and_folders("Master Database Files")
+    return {"scan_folder": scan_folder, "master_files": master_files, "naming": naming, "sort": sort}
+
+
+if __name__ == "__main__":
+    print("🚀 EPC Stocktake Pipeline")
+    parser = argparse.ArgumentParser(description="Sort, merge and compare scan files in one run")
+    parser.add_argument("--scans", help="Folder with raw scan files")
+    parser.add_argument("--masters", nargs="*", default=[], help="Master database file(s)")
+    parser.add_argument("--naming", choices=["reader", "location"], default="reader",
+                        help="File names are Reader_Location_N (reader) or Location_N (location)")
+    parser.add_argument("--sort", action="store_true", help="Sort files into format groups first")
+    parser.add_argument("--prefix", help="Comma-separated EPC filter terms: prefixes, hex ranges (30340000-3034FFFF), len:24, re:<regex>")
+    parser.add_argument("--truncate", type=int, help="Characters to keep from each EPC")
+    parser.add_argument("--gs1", action="store_true", help="Decode GS1 fields")
+    parser.add_argument("--no-reconcile", action="store_true", help="Skip the unexpected-tags list")
+    parser.add_argument("--manifest", help="Reader/Location manifest (default: epc_manifest.csv/.json found next to the scans)")
+    args = parser.parse_args()
+    prefix_filters = parse_terms(args.prefix) if args.prefix else None
+    try:
+        compile_filter(prefix_filters)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.scans:
+        inputs = {"scan_folder": args.scans, "master_files": args.masters, "naming": args.naming, "sort": args.sort}
+    else:
+        inputs = ask_pipeline_inputs()
+        if not inputs:
+            print("❌ No folder selected.")
+            sys.exit(0)
+
+    merged_file, output_folder = run_pipeline(
+        inputs["scan_folder"], inputs["master_files"], inputs["naming"], inputs["sort"],
+        prefix_filters=prefix_filters,
+        char_limit=args.truncate,
+        gs1_options={"company_prefixes": [], "item_references": []} if args.gs1 else None,
+        reconcile=not args.no_reconcile,
+        manifest=args.manifest,
+    )
+    if merged_file:
+        print(f"✅ Pipeline complete. Merged: {merged_file}" + (f" | Comparison: {output_folder}" if output_folder else ""))
@@ -0,0 +1,31 @@
+# EPC Pool Workers
+# Functions run in process pools by the comparison and quick count tools. They live in
+# this importable module because the launcher runs each tool with runpy as __main__: a
+# spawned child of the frozen EXE never re-imports that script, so workers defined in it
+# cannot be unpickled and the pool breaks. The tool modules are imported inside the child.
+
+_scan_index = None  # Read-only scan index, set once per comparison worker
+_output = None      # Output mode / columns, set once per comparison worker
+
+
+def init_compare_worker(scan_index, output):
+    global _scan_index, _output
+    _scan_index = scan_index
+    _output = output
+
+
+def compare_worker(task):
+    """One master sheet (master_file, sheet, tag_sheet) -> (result, None) or (None, error message)"""
+    from epc_master_comparison import load_and_compare_master
+
+    try:
+        return load_and_compare_master(*task, _scan_index, _output), None
+    except Exception as e:
+        return None, str(e)
+
+
+def sketch_worker(task):
+    """One scan file -> (registers, reads) or (None, error message)"""
+    from epc_quick_count import sketch_file
+
+    return sketch_file(task)
@@ -0,0 +1,108 @@
+# EPC Prefix Matching
+# Matches master EPCs to scanned EPCs when one side was truncated (e.g. 24-character scans
+# against 32-character masters, or the reverse), or on the first N characters only.
+# Uses binary searches over one sorted array of scanned EPCs: O((n + m) log m), no pairwise loops.
+
+import numpy as np
+
+MAX_CHAR = "\U0010FFFF"  # Sorts after every character: m + MAX_CHAR bounds all strings starting with m
+
+
+def build_match_index(scan_epcs, key_length=None):
+    """
+    Sorted scanned EPCs for matching. With key_length, keys are the first key_length
+    characters (full EPCs are kept alongside); otherwise keys are the full EPCs.
+    """
+    full = np.asarray(scan_epcs, dtype=str)
+    full = full[full != ""]
+    keys = full.astype(f"U{key_length}") if key_length else full
+    order = np.argsort(keys, kind="stable")
+    keys, full = keys[order], full[order]
+    return {
+        "keys": keys,
+        "full": full,
+        "sorted_full": np.sort(full) if key_length else full,
+        "lengths": np.unique(np.char.str_len(keys)) if len(keys) else np.array([], dtype=int),
+        "key_length": key_length,
+    }
+
+
+def _lookup(keys, values):
+    """Positions of values in sorted keys and whether each value is present"""
+    pos = np.searchsorted(keys, values)
+    safe = np.minimum(pos, max(len(keys) - 1, 0))
+    present = (pos < len(keys)) & (keys[safe] == values) if len(keys) else np.zeros(len(values), bool)
+    return safe, present
+
+
+def match_epcs(master_epcs, index):
+    """
+    Match master EPCs against a match index. Returns (matched, candidates, kind):
+    matched   - the scanned EPC each master EPC matched ("" if none)
+    candidates - how many scanned EPCs it could match (> 1 = ambiguous)
+    kind      - "Exact", "Prefix" or "Key" per row ("" if not matched)
+    """
+    keys, full = index["keys"], index["full"]
+    master = np.asarray(master_epcs, dtype=str)
+    matched = np.full(len(master), "", dtype=object)
+    candidates = np.zeros(len(master), dtype=np.int64)
+    kind = np.full(len(master), "", dtype=object)
+    if not len(keys) or not len(master):
+        return matched, candidates, kind
+
+    usable = (master != "") & (master != "nan")
+
+    if index["key_length"]:
+        # Same first N characters: count scanned EPCs sharing the master's key
+        wanted = master.astype(f"U{index['key_length']}")
+        lo = np.searchsorted(keys, wanted, side="left")
+        hi = np.searchsorted(keys, wanted, side="right")
+        hit = usable & (hi > lo)
+        matched[hit] = full[lo[hit]]
+        candidates[hit] = (hi - lo)[hit]
+        kind[hit] = "Key"
+        # The identical EPC, when it was scanned, is an unambiguous match
+        _, exact = _lookup(index["sorted_full"], master)
+        exact &= usable
+        matched[exact] = master[exact]
+        candidates[exact] = 1
+        kind[exact] = "Exact"
+        return matched, candidates, kind
+
+    # 1) Exact EPC, or scanned EPCs that start with the (truncated) master EPC
+    lo = np.searchsorted(keys, master, side="left")
+    hi = np.searchsorted(keys, np.char.add(master, MAX_CHAR), side="left")
+    _, exact = _lookup(keys, master)
+    exact &= usable
+    longer = usable & ~exact & (hi > lo)
+    matched[exact] = master[exact]
+    candidates[exact] = 1
+    kind[exact] = "Exact"
+    matched[longer] = full[lo[longer]]
+    candidates[longer] = (hi - lo)[longer]
+    kind[longer] = "Prefix"
+
+    # 2) Truncated scanned EPCs that are a prefix of the master EPC, longest scan length first
+    todo = usable & ~exact & ~longer
+    shorter = np.zeros(len(master), dtype=bool)
+    master_lengths = np.char.str_len(master)
+    for length in index["lengths"][::-1]:
+        rows = np.flatnonzero(todo & (master_lengths > length))
+        if not len(rows):
+            continue
+        prefixes = master[rows].astype(f"U{length}")
+        pos, present = _lookup(keys, prefixes)
+        rows, pos = rows[present], pos[present]
+        matched[rows] = full[pos]
+        candidates[rows] = 1
+        kind[rows] = "Prefix"
+        todo[rows] = False
+        shorter[rows] = True
+
+    # A truncated scan claimed by several master EPCs is ambiguous as well
+    rows = np.flatnonzero(shorter)
+    if len(rows):
+        _, inverse, counts = np.unique(matched[rows].astype(str), return_inverse=True, return_counts=True)
+        candidates[rows] = np.maximum(candidates[rows], counts[inverse.ravel()])
+
+    return matched, candidates, kind
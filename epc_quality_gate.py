@@ -0,0 +1,95 @@
+# EPC Quality Gate
+# Vectorized validation of raw reads before they are merged: hex-only, allowed lengths,
+# optional header check and truncation of over-long reads. Rejected reads are kept with
+# a reason so they can be written to a per-run reject file.
+
+import os
+import numpy as np
+import pandas as pd
+from tkinter import simpledialog, messagebox
+
+DEFAULT_LENGTHS = (24, 32)   # Hex characters: 96-bit and 128-bit EPCs
+REJECT_FOLDER = "rejects"
+
+
+def ask_quality_rules():
+    """Ask for the quality gate settings; returns a rules dict or None to skip validation"""
+    if not messagebox.askyesno(
+        "EPC Quality Gate",
+        "Validate EPCs (hex only, allowed lengths) and write rejected reads to a reject file?"
+    ):
+        return None
+
+    answer = simpledialog.askstring(
+        "Allowed Lengths",
+        "Allowed EPC lengths in hex characters (e.g. 24, 32):",
+        initialvalue=", ".join(str(n) for n in DEFAULT_LENGTHS)
+    )
+    lengths = sorted({int(p) for p in (answer or "").replace(" ", "").split(",") if p.isdigit()}) or list(DEFAULT_LENGTHS)
+
+    answer = simpledialog.askstring(
+        "EPC Headers",
+        "Allowed EPC header(s) — first 2 hex characters (e.g. 30, 31, 36, E2).\nLeave blank to allow any header:"
+    )
+    headers = [p.strip().upper() for p in answer.split(",") if p.strip()] if answer else []
+
+    truncate = messagebox.askyesno(
+        "Over-long Reads",
+        "Cut reads longer than an allowed length down to the nearest allowed length (Yes)\n"
+        "or reject them (No)?"
+    )
+    return {"lengths": lengths, "headers": headers, "truncate": truncate}
+
+
+def validate_epcs(df, rules, epc_col="EPC"):
+    """
+    Split df into (valid, rejected). rejected keeps the original rows plus a
+    "Reject Reason" column. All checks are whole-column string operations.
+    """
+    epcs = df[epc_col].astype(str).str.strip()
+    lengths = epcs.str.len().to_numpy()
+    allowed = np.asarray(rules.get("lengths") or DEFAULT_LENGTHS)
+
+    if rules.get("truncate"):
+        # Longest allowed length that still fits each read (0 = shorter than all)
+        targets = np.concatenate(([0], allowed))[np.searchsorted(allowed, lengths, side="right")]
+        for length in allowed:
+            cut = (targets == length) & (lengths > length)
+            if cut.any():
+                epcs = epcs.where(~cut, epcs.str.slice(0, int(length)))
+        lengths = epcs.str.len().to_numpy()
+
+    empty = lengths == 0
+    non_hex = ~epcs.str.fullmatch(r"[0-9A-Fa-f]+").fillna(False).to_numpy(dtype=bool)
+    bad_length = ~np.isin(lengths, allowed)
+    headers = rules.get("headers")
+    bad_header = (~epcs.str.slice(0, 2).str.upper().isin(headers).to_numpy(dtype=bool)) if headers else np.zeros(len(epcs), bool)
+
+    reason = np.select(
+        [empty, non_hex, bad_length, bad_header],
+        ["Empty EPC", "Non-hex characters", "Length not allowed", "Header not allowed"],
+        default=""
+    )
+    rejected_mask = reason != ""
+
+    valid = df[~rejected_mask].assign(**{epc_col: epcs[~rejected_mask].astype(df[epc_col].dtype)})
+    rejected = df[rejected_mask].copy()
+    rejected["Reject Reason"] = reason[rejected_mask]
+    return valid, rejected
+
+
+def save_rejects(rejects, output_folder=REJECT_FOLDER, label="Run"):
+    """Write the rejected reads of one run with a reason summary; returns the file path or None"""
+    rejects = [r for r in rejects if r is not None and not r.empty]
+    if not rejects:
+        return None
+    rejected = pd.concat(rejects, ignore_index=True)
+
+    os.makedirs(output_folder, exist_ok=True)
+    output_file = os.path.join(output_folder, f"Rejected_EPCs_{label}.csv")
+    rejected.to_csv(output_file, index=False)
+
+    counts = rejected["Reject Reason"].value_counts()
+    print(f"🚫 {len(rejected)} reads rejected ({', '.join(f'{r}: {n}' for r, n in counts.items())})")
+    print(f"📄 Reject file saved: {output_file}")
+    return output_file
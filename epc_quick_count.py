@@ -0,0 +1,247 @@
+# EPC Quick Count
+# Approximate unique-tag counts per location and reader without a full merge.
+# Scan files go through the usual EPC column detection, each file is reduced to a
+# HyperLogLog sketch (16 KB, ~0.8% standard error) in a process pool, and file sketches
+# are merged per Location / Reader. Sketches are saved so counts from several runs or
+# machines can be combined later (--combine) without re-reading any scans.
+#
+#   python epc_quick_count.py --scans <folder> [--naming reader|location] [--manifest m.csv]
+#   python epc_quick_count.py --combine quick_count/a.npz quick_count/b.npz
+#   (no arguments: the scan folder and naming are asked with dialogs)
+
+import os
+import sys
+import pickle
+import argparse
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+import pandas as pd
+import tkinter as tk
+from tkinter import filedialog, messagebox
+
+import epc_merger_reader
+from epc_manifest import resolve_manifest, file_metadata
+from epc_parse_profile import read_with_profile
+from epc_pipeline import find_batches, detect_epc_index
+from epc_pool_workers import sketch_worker
+
+PRECISION = 14  # 2^14 registers: standard error 1.04 / sqrt(16384) ≈ 0.8%
+OUTPUT_FOLDER = "quick_count"
+MAX_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+
+
+def _bit_length(values):
+    """Bit length of every uint64 value, by halving (no float log2 rounding)"""
+    values = values.copy()
+    length = np.zeros(len(values), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        high = values >= (np.uint64(1) << np.uint64(shift))
+        values[high] >>= np.uint64(shift)
+        length[high] += shift
+    return length + (values > 0)
+
+
+class HyperLogLog:
+    """HyperLogLog sketch over 64-bit EPC hashes; sketches with the same precision merge by register max"""
+
+    def __init__(self, precision=PRECISION, registers=None):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8) if registers is None else registers
+
+    def add_epcs(self, epcs):
+        """Add EPC strings (hashed with pandas' stable 64-bit hash)"""
+        epcs = pd.Series(epcs, dtype=object).dropna().astype(str).str.strip()
+        epcs = epcs[epcs != ""].to_numpy(dtype=object)
+        if len(epcs):
+            self.add_hashes(pd.util.hash_array(epcs))
+        return self
+
+    def add_hashes(self, hashes):
+        p = self.precision
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        index = (hashes >> np.uint64(64 - p)).astype(np.int64)
+        rest = hashes << np.uint64(p)  # Remaining 64 - p bits, left-aligned
+        # Rank = leading zeros + 1 of the remaining bits (64 - p + 1 when they are all zero)
+        rank = np.minimum(64 - _bit_length(rest) + 1, 64 - p + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge sketches with different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            return m * np.log(m / zeros)  # Linear counting for small cardinalities
+        return raw
+
+
+def sketch_file(task):
+    """Worker: one scan file -> (registers, reads) or (None, error message)"""
+    file, epc_index, profile, precision = task
+    try:
+        if profile:
+            epcs = read_with_profile(file, profile)["EPC"]
+        else:
+            df = epc_merger_reader.read_file_flexible(file)
+            df = df.dropna(axis=1, how="all").dropna(axis=0, how="all")
+            if epc_index >= len(df.columns):
+                return None, f"column index {epc_index} out of range"
+            epcs = df[df.columns[epc_index]].dropna()
+        return HyperLogLog(precision).add_epcs(epcs).registers, len(epcs)
+    except Exception as e:
+        return None, str(e)
+
+
+def sketch_files(tasks):
+    """Sketch files in a process pool (in-process if it cannot start); yields (file, registers, reads or error)"""
+    done = 0
+    if MAX_WORKERS > 1 and len(tasks) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=min(MAX_WORKERS, len(tasks))) as pool:
+                for registers, reads in pool.map(sketch_worker, tasks, chunksize=8):
+                    yield tasks[done][0], registers, reads
+                    done += 1
+            return
+        except (BrokenProcessPool, pickle.PicklingError, OSError) as e:
+            print(f"⚠️ Parallel sketching unavailable ({e}), continuing in this process.")
+
+    for task in tasks[done:]:
+        yield (task[0], *sketch_file(task))
+
+
+def quick_count(scan_folder, naming="reader", manifest=None, precision=PRECISION):
+    """Sketch every scan file and merge per Location / Reader; returns {(group, name): [sketch, reads]}"""
+    fields = ("Reader", "Location") if naming == "reader" else ("Location",)
+    sketches = {}
+    for files in find_batches(scan_folder):
+        epc_index, profile = detect_epc_index(epc_merger_reader, files)
+        if epc_index is None:
+            print(f"⚠️ Skipping {Path(files[0]).parent.name} — no EPC-like data found.")
+            continue
+        metadata = resolve_manifest(files, manifest)
+
+        tasks = [(file, epc_index, profile, precision) for file in files]
+        for file, registers, reads in sketch_files(tasks):
+            if registers is None:
+                print(f"❌ Skipping {file}: {reads}")
+                continue
+            sketch = HyperLogLog(precision, registers)
+            values = file_metadata(file, metadata, fields)
+            for key in [("All", "All")] + [(field, values[field]) for field in fields]:
+                entry = sketches.setdefault(key, [HyperLogLog(precision), 0])
+                entry[0].merge(sketch)
+                entry[1] += reads
+        print(f"✅ Sketched {len(files)} files from {Path(files[0]).parent.name}")
+    return sketches
+
+
+def save_sketches(sketches, path):
+    """Store sketches as one .npz: names, stacked registers and read counts"""
+    keys = list(sketches)
+    precision = sketches[keys[0]][0].precision
+    np.savez_compressed(
+        path,
+        precision=precision,
+        names=np.array(["|".join(key) for key in keys]),
+        registers=np.stack([sketches[key][0].registers for key in keys]),
+        reads=np.array([sketches[key][1] for key in keys], dtype=np.int64),
+    )
+    print(f"💾 Sketches saved: {path}")
+    return path
+
+
+def load_sketches(path):
+    with np.load(path) as data:
+        precision = int(data["precision"])
+        return {
+            tuple(name.split("|", 1)): [HyperLogLog(precision, registers.copy()), int(reads)]
+            for name, registers, reads in zip(data["names"], data["registers"], data["reads"])
+        }
+
+
+def combine_sketches(parts):
+    """Merge sketch sets from several runs or machines (order does not matter)"""
+    combined = {}
+    for sketches in parts:
+        for key, (sketch, reads) in sketches.items():
+            if key in combined:
+                combined[key][0].merge(sketch)
+                combined[key][1] += reads
+            else:
+                combined[key] = [HyperLogLog(sketch.precision, sketch.registers.copy()), reads]
+    return combined
+
+
+def sketch_table(sketches):
+    rows = [
+        {"Group": group, "Name": name, "Reads": reads, "Estimated Unique EPCs": int(round(sketch.estimate()))}
+        for (group, name), (sketch, reads) in sketches.items()
+    ]
+    order = {"All": 0, "Location": 1, "Reader": 2}
+    return pd.DataFrame(rows).sort_values(["Group", "Name"], key=lambda s: s.map(order) if s.name == "Group" else s)
+
+
+def save_quick_count(sketches, label):
+    """Write the estimate table (Excel) and the mergeable sketches (.npz) to quick_count/"""
+    os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+    base = os.path.join(OUTPUT_FOLDER, f"Quick_Count_{label}_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    table = sketch_table(sketches)
+    table.to_excel(base + ".xlsx", index=False)
+    print(table.to_string(index=False))
+    print(f"📄 Quick count saved: {base}.xlsx")
+    save_sketches(sketches, base + ".npz")
+    return base + ".xlsx"
+
+
+def ask_quick_count_inputs():
+    root = tk.Tk()
+    root.attributes("-topmost", True)
+    root.withdraw()
+    scan_folder = filedialog.askdirectory(title="Select Folder with Raw Scan Files")
+    if not scan_folder:
+        return None
+    naming = "reader" if messagebox.askyesno(
+        "File Names", "Are files named Reader_Location_N (Yes) or Location_N (No)?"
+    ) else "location"
+    return scan_folder, naming
+
+
+if __name__ == "__main__":
+    print("⚡ EPC Quick Count (approximate unique tags)")
+    parser = argparse.ArgumentParser(description="Approximate unique EPCs per location / reader")
+    parser.add_argument("--scans", help="Folder with raw scan files")
+    parser.add_argument("--naming", choices=["reader", "location"], default="reader",
+                        help="File names are Reader_Location_N (reader) or Location_N (location)")
+    parser.add_argument("--manifest", help="Reader/Location manifest (default: found next to the scans)")
+    parser.add_argument("--combine", nargs="+", help="Combine saved .npz sketch files instead of scanning")
+    args = parser.parse_args()
+
+    if args.combine:
+        sketches = combine_sketches(load_sketches(path) for path in args.combine)
+        save_quick_count(sketches, "Combined")
+        sys.exit(0)
+
+    if args.scans:
+        scan_folder, naming = args.scans, args.naming
+    else:
+        inputs = ask_quick_count_inputs()
+        if not inputs:
+            print("❌ No folder selected.")
+            sys.exit(0)
+        scan_folder, naming = inputs
+
+    sketches = quick_count(scan_folder, naming, args.manifest)
+    if not sketches:
+        print("❌ No EPCs found in the scan files.")
+        sys.exit(0)
+    save_quick_count(sketches, Path(scan_folder).name)
@@ -0,0 +1,183 @@
+# EPC Snapshot Presence Matrix
+# Indexes the master once and compares it against many scan snapshots (per day, shift, reader...)
+# in one pass. Presence is kept as a packed bitmap (one bit per master row per snapshot), so memory
+# stays at masters x snapshots / 8 bytes; outputs per-EPC presence patterns and per-snapshot coverage.
+
+import os
+import sys
+from pathlib import Path
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import tkinter as tk
+from tkinter import messagebox
+
+from epc_master_comparison import (
+    select_files_and_folders, build_master_tasks, read_master_file, detect_epc_column,
+    save_result_file, auto_adjust_columns,
+)
+
+POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
+
+
+def load_master_rows(master_files):
+    """All master rows as EPC + Master File (one bit per row later on)"""
+    frames = []
+    for master_file, sheet, tag_sheet in build_master_tasks(master_files):
+        try:
+            df = read_master_file(master_file, sheet)
+        except Exception as e:
+            print(f"❌ Error reading {master_file}: {e}")
+            continue
+        epc_col = detect_epc_column(df)
+        if epc_col is None:
+            print(f"⚠️ Skipping {master_file} [{sheet}] — no EPC column found.")
+            continue
+        name = f"{Path(master_file).stem}_{sheet}" if tag_sheet else Path(master_file).stem
+        frames.append(pd.DataFrame({"EPC": df[epc_col].astype(str).str.strip(), "Master File": name}))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["EPC", "Master File"])
+
+
+def read_snapshot_epcs(file):
+    """Unique EPCs of one snapshot (a merged file with an EPC column)"""
+    if file.lower().endswith(".csv"):
+        df = pd.read_csv(file, usecols=lambda c: c == "EPC", dtype=str)
+    else:
+        df = pd.read_excel(file, usecols=lambda c: c == "EPC", dtype=str)
+    if "EPC" not in df.columns:
+        raise ValueError("no EPC column found")
+    return pd.unique(df["EPC"].dropna().str.strip())
+
+
+class PresenceMatrix:
+    """Master EPC rows x snapshots presence bitmap (np.packbits bit order)"""
+
+    def __init__(self, master_epcs, n_snapshots):
+        # Index the master once: every row maps to a unique-EPC code
+        self.codes, uniques = pd.factorize(np.asarray(master_epcs))
+        self.unique_index = pd.Index(uniques)
+        self.n_snapshots = n_snapshots
+        self.bits = np.zeros((len(self.codes), (n_snapshots + 7) // 8), dtype=np.uint8)
+
+    def add_snapshot(self, position, snapshot_epcs):
+        """Set the snapshot's bit on every master row it contains; returns rows found"""
+        positions = self.unique_index.get_indexer(snapshot_epcs)
+        hit = np.zeros(len(self.unique_index), dtype=bool)
+        hit[positions[positions >= 0]] = True
+        present = hit[self.codes]
+        self.bits[:, position >> 3] |= present.astype(np.uint8) << np.uint8(7 - (position & 7))
+        return int(present.sum())
+
+    def patterns(self):
+        """
+        Per-row presence pattern ("1" = seen) with snapshots seen, first and last
+        snapshot position. Work is done once per distinct pattern, not per row.
+        """
+        row_keys = np.ascontiguousarray(self.bits).view(f"V{self.bits.shape[1]}").ravel()
+        unique_keys, inverse, counts = np.unique(row_keys, return_inverse=True, return_counts=True)
+        unique_bits = unique_keys.view(np.uint8).reshape(len(unique_keys), self.bits.shape[1])
+        unpacked = np.unpackbits(unique_bits, axis=1, count=self.n_snapshots).astype(bool)
+
+        seen = POPCOUNT[unique_bits].sum(axis=1)
+        first = np.where(seen > 0, unpacked.argmax(axis=1), -1)
+        last = np.where(seen > 0, self.n_snapshots - 1 - unpacked[:, ::-1].argmax(axis=1), -1)
+        pattern = np.array(["".join("1" if b else "0" for b in row) for row in unpacked], dtype=object)
+
+        table = pd.DataFrame({"Pattern": pattern, "Snapshots Seen": seen, "First": first, "Last": last,
+                              "Master Rows": counts})
+        return table, inverse.ravel()
+
+
+def build_presence(master_files, snapshot_files):
+    """Run the whole comparison; returns (presence rows, snapshot coverage, pattern table)"""
+    master = load_master_rows(master_files)
+    if master.empty:
+        print("❌ No EPCs loaded from master files.")
+        return None
+    print(f"📦 Master index: {len(master)} rows")
+
+    matrix = PresenceMatrix(master["EPC"], len(snapshot_files))
+    names = [Path(file).stem for file in snapshot_files]
+    coverage = []
+    for position, file in enumerate(snapshot_files):
+        try:
+            epcs = read_snapshot_epcs(file)
+        except Exception as e:
+            print(f"❌ Error reading {file}: {e}")
+            epcs = np.array([], dtype=object)
+        found = matrix.add_snapshot(position, epcs)
+        coverage.append({
+            "Position": position + 1,
+            "Snapshot": names[position],
+            "Scanned EPCs": len(epcs),
+            "Master Rows Found": found,
+            "% Found": f"{100 * found / len(master):.2f}%",
+        })
+        print(f"🔍 {names[position]}: {found}/{len(master)} master rows found")
+
+    table, inverse = matrix.patterns()
+    label = np.array(names + [""], dtype=object)  # -1 (never seen) maps to ""
+    presence = master.assign(
+        **{
+            "Pattern": table["Pattern"].to_numpy()[inverse],
+            "Snapshots Seen": table["Snapshots Seen"].to_numpy()[inverse],
+            "First Seen": label[table["First"].to_numpy()[inverse]],
+            "Last Seen": label[table["Last"].to_numpy()[inverse]],
+        }
+    )
+    patterns = (
+        table.drop(columns=["First", "Last"])
+        .sort_values(["Master Rows", "Pattern"], ascending=[False, True])
+        .reset_index(drop=True)
+    )
+
+    # Master rows seen in at least one snapshot / in every snapshot
+    any_seen = int((presence["Snapshots Seen"] > 0).sum())
+    coverage.append({
+        "Position": "", "Snapshot": "ANY SNAPSHOT", "Scanned EPCs": "",
+        "Master Rows Found": any_seen, "% Found": f"{100 * any_seen / len(master):.2f}%",
+    })
+    all_seen = int((presence["Snapshots Seen"] == len(snapshot_files)).sum())
+    coverage.append({
+        "Position": "", "Snapshot": "ALL SNAPSHOTS", "Scanned EPCs": "",
+        "Master Rows Found": all_seen, "% Found": f"{100 * all_seen / len(master):.2f}%",
+    })
+    return presence, pd.DataFrame(coverage), patterns
+
+
+def save_presence(presence, coverage, patterns):
+    os.makedirs("comparison_results", exist_ok=True)
+    output_folder = os.path.join("comparison_results", f"Snapshot_Presence_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    os.makedirs(output_folder, exist_ok=True)
+
+    save_result_file(presence, os.path.join(output_folder, "EPC_Presence_Patterns.xlsx"))
+
+    summary_file = os.path.join(output_folder, "Snapshot_Coverage_Summary.xlsx")
+    with pd.ExcelWriter(summary_file) as writer:
+        coverage.to_excel(writer, sheet_name="Snapshot Coverage", index=False)
+        patterns.to_excel(writer, sheet_name="Patterns", index=False)
+    auto_adjust_columns(summary_file)
+    print(f"📄 Summary file saved: {summary_file}")
+    return output_folder
+
+
+if __name__ == "__main__":
+    print("🧮 EPC Snapshot Presence Matrix")
+
+    snapshot_files = select_files_and_folders("Scan Snapshot Files (one merged file per snapshot)")
+    if not snapshot_files:
+        print("❌ No snapshot files selected.")
+        sys.exit(0)
+    snapshot_files = sorted(snapshot_files)
+
+    master_files = select_files_and_folders("Master Database Files")
+    if not master_files:
+        print("❌ No master database files selected.")
+        sys.exit(0)
+
+    result = build_presence(master_files, snapshot_files)
+    if result:
+        output_folder = save_presence(*result)
+        root = tk.Tk()
+        root.withdraw()
+        messagebox.showinfo("Presence Matrix Complete", f"Results saved to:\n{output_folder}")
@@ -0,0 +1,201 @@
+# EPC Tail-Follow Ingestion
+# Follows growing fixed-reader CSVs in a folder, parsing only newly appended bytes
+# (with the read_file_flexible rules) and keeping a live EPC aggregate and found count
+#
+#   python epc_tail_follow.py [folder] [--interval 2] [--naming reader|location] [--master file ...]
+
+import io
+import os
+import sys
+import time
+import argparse
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+import pandas as pd
+import tkinter as tk
+from tkinter import filedialog
+
+from epc_master_comparison import build_master_tasks, read_master_file, detect_epc_column
+from epc_parse_profile import is_epc_like
+from epc_manifest import file_metadata
+
+POLL_INTERVAL = 2.0   # Seconds between folder scans
+SCAN_EXTENSIONS = (".csv", ".txt")
+
+
+def new_file_state(path, naming):
+    fields = ("Location",) if naming == "location" else ("Reader", "Location")
+    names = {"Reader": "Unknown", **file_metadata(path, None, fields)}
+    return {"offset": 0, "partial": b"", "data_started": False, "epc_col": None,
+            "reader": names["Reader"], "location": names["Location"],
+            "reads": Counter()}  # This file's contribution, removed again if the file is truncated
+
+
+def read_appended_lines(path, state):
+    """Return complete lines appended since the last call; a trailing partial line is kept for later"""
+    size = os.path.getsize(path)
+    if size < state["offset"]:
+        # File was truncated or replaced: start over, handing back its earlier reads
+        print(f"🔄 {Path(path).name} was truncated, re-reading from the start")
+        state.update(offset=0, partial=b"", data_started=False, epc_col=None,
+                     dropped=state["reads"], reads=Counter())
+    if size == state["offset"]:
+        return []
+
+    with open(path, "rb") as f:
+        f.seek(state["offset"])
+        chunk = f.read(size - state["offset"])
+    state["offset"] = size
+
+    data = state["partial"] + chunk
+    last_newline = data.rfind(b"\n")
+    if last_newline < 0:
+        state["partial"] = data
+        return []
+    state["partial"] = data[last_newline + 1:]
+    return data[:last_newline + 1].decode("utf-8", errors="replace").splitlines()
+
+
+def parse_appended(lines, state):
+    """Parse new lines with the read_file_flexible rules; returns a Series of EPCs"""
+    if not state["data_started"]:
+        # Skip summary/header rows until the first row with an EPC-like cell
+        for i, line in enumerate(lines):
+            if any(is_epc_like(cell) for cell in line.strip().split(",")):
+                state["data_started"] = True
+                lines = lines[i:]
+                break
+        else:
+            return pd.Series([], dtype=object)
+
+    text = "\n".join(line for line in lines if line.strip())
+    if not text:
+        return pd.Series([], dtype=object)
+    df = pd.read_csv(io.StringIO(text), header=None, on_bad_lines="skip", dtype=str)
+
+    if state["epc_col"] is None:
+        # Same auto-pick as the merger preview: the column with the most EPC-like values
+        scores = {col: int(df[col].dropna().map(is_epc_like).sum()) for col in df.columns}
+        state["epc_col"] = max(scores, key=scores.get)
+    if state["epc_col"] not in df.columns:
+        return pd.Series([], dtype=object)
+    return df[state["epc_col"]].dropna().str.strip()
+
+
+def load_master_index(master_files):
+    """Unique master EPCs as a pandas Index (for found counts)"""
+    epcs = []
+    for master_file, sheet, _ in build_master_tasks(master_files):
+        df = read_master_file(master_file, sheet)
+        epc_col = detect_epc_column(df)
+        if epc_col is not None:
+            epcs.append(df[epc_col].astype(str).str.strip())
+    return pd.Index(pd.concat(epcs).unique()) if epcs else pd.Index([])
+
+
+def follow_folder(folder, naming="reader", master_files=None, interval=POLL_INTERVAL):
+    """Poll the folder, ingest appended reads and print live totals until Ctrl+C"""
+    states = {}
+    reads = Counter()          # (EPC, Location, Reader) -> read count
+    seen = set()
+    master = load_master_index(master_files) if master_files else None
+    found = set()
+    if master is not None:
+        print(f"📦 Master index: {len(master)} unique EPCs")
+    print(f"👀 Following {folder} every {interval}s (Ctrl+C to stop and save)")
+
+    try:
+        while True:
+            new_reads = 0
+            for path in sorted(Path(folder).iterdir()):
+                if not path.is_file() or path.suffix.lower() not in SCAN_EXTENSIONS:
+                    continue
+                state = states.setdefault(path, new_file_state(path, naming))
+                try:
+                    epcs = parse_appended(read_appended_lines(path, state), state)
+                except Exception as e:
+                    print(f"⚠️ Could not read {path.name}: {e}")
+                    continue
+                dropped = state.pop("dropped", None)
+                if dropped:
+                    # Forget what the old contents counted, so re-read lines are not counted twice
+                    reads -= dropped
+                    seen = {epc for epc, _, _ in reads}
+                    if master is not None:
+                        found = set(master.intersection(list(seen)))
+                if epcs.empty:
+                    continue
+
+                new_reads += len(epcs)
+                counts = epcs.value_counts()
+                file_reads = {(epc, state["location"], state["reader"]): n for epc, n in counts.items()}
+                state["reads"].update(file_reads)
+                reads.update(file_reads)
+                new_unique = set(counts.index) - seen
+                seen |= new_unique
+                if master is not None and new_unique:
+                    found.update(master.intersection(list(new_unique)))
+
+            if new_reads:
+                status = f"📡 {datetime.now():%H:%M:%S} +{new_reads} reads | {len(seen)} unique EPCs"
+                if master is not None:
+                    status += f" | found {len(found)}/{len(master)} ({100 * len(found) / max(len(master), 1):.2f}%)"
+                print(status)
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("🛑 Stopped following.")
+
+    return save_snapshot(reads)
+
+
+def save_snapshot(reads):
+    """Save the running aggregate like the mergers do (dominant Location, All Locations, Read Count)"""
+    if not reads:
+        print("❌ No reads collected.")
+        return None
+    from epc_location_resolver import dominant_values
+
+    rows = pd.DataFrame(
+        [(epc, location, reader, n) for (epc, location, reader), n in reads.items()],
+        columns=["EPC", "Location", "Reader", "Read Count"]
+    )
+    merged = (
+        rows.groupby("EPC")
+        .agg({
+            "Reader": lambda x: ", ".join(sorted(set(x))),
+            "Location": lambda x: ", ".join(sorted(set(x))),
+            "Read Count": "sum",
+        })
+        .rename(columns={"Location": "All Locations"})
+        .reset_index()
+    )
+    merged.insert(2, "Location", merged["EPC"].map(dominant_values(rows, "Location", weight_col="Read Count")))
+
+    os.makedirs("merged", exist_ok=True)
+    filename = f"merged/Merged_EPCs_Live_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    merged.to_excel(filename, index=False)
+    print(f"✅ Snapshot saved to: {filename}")
+    return filename
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Follow growing fixed-reader CSV files")
+    parser.add_argument("folder", nargs="?", help="Folder with reader CSVs (dialog if omitted)")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL)
+    parser.add_argument("--naming", choices=["reader", "location"], default="reader",
+                        help="File names are Reader_Location_N (reader) or Location_N (location)")
+    parser.add_argument("--master", nargs="*", default=None, help="Master file(s) for live found counts")
+    args = parser.parse_args()
+
+    folder = args.folder
+    if not folder:
+        root = tk.Tk()
+        root.attributes("-topmost", True)
+        root.withdraw()
+        folder = filedialog.askdirectory(title="Select Folder with Fixed-Reader CSVs")
+    if not folder:
+        print("❌ No folder selected.")
+        sys.exit(0)
+
+    follow_folder(folder, args.naming, args.master, args.interval)
@@ -4,6 +4,7 @@ import sys
 import os
 import subprocess
 import runpy
+import multiprocessing
 import tkinter as tk
 from tkinter import messagebox
 
@@ -54,9 +55,29 @@ SCRIPTS = {
         "epc_merged_final.py",
         "Merge already-cleaned Excel files and consolidate duplicates across readers or locations.\nSaves to the merged_final/ folder."
     ),
+    "Combine Team Partials": (
+        "epc_partial_aggregate.py",
+        "Combine the partial aggregates written by each team's merge (merged/partials/).\nGives the same table as one big merge, without re-reading any Excel output."
+    ),
     "Master Comparison": (
         "epc_master_comparison.py",
         "Compare final merged results with a client-provided master EPC list.\nOutputs whether each tag was found, and where."
+    ),
+    "Run Full Pipeline": (
+        "epc_pipeline.py",
+        "Sort, merge and compare in one run: pick the raw scan folder and the master files.\nOnly the merged workbook and the comparison results are written to disk."
+    ),
+    "Quick Unique Count": (
+        "epc_quick_count.py",
+        "Estimate unique tags per location and reader without a full merge (within ~1%).\nSaved sketches from several runs or machines can be combined later."
+    ),
+    "Snapshot Presence": (
+        "epc_snapshot_matrix.py",
+        "Compare one master against many scan snapshots (days, shifts, readers) in one pass.\nOutputs per-EPC presence patterns and per-snapshot coverage."
+    ),
+    "Stocktake History": (
+        "epc_history.py",
+        "Compare two recorded runs from the local history store.\nExports newly found, newly missing and moved EPCs to the history/ folder."
     )
 }
 
@@ -70,6 +91,7 @@ def _run_tool_from_cli():
     if len(sys.argv) >= 3 and sys.argv[1] == "--run":
         script_name = sys.argv[2]
         script_path = resource_path(script_name)
+        sys.argv = [script_path] + sys.argv[3:]  # The tool sees only its own arguments
         try:
             runpy.run_path(script_path, run_name="__main__")
         except Exception as e:
@@ -82,6 +104,9 @@ def _run_tool_from_cli():
         return True
     return False
 
+# Process-pool workers spawned by a tool re-enter this EXE; let them run and exit
+multiprocessing.freeze_support()
+
 # If called to run a tool, do it and stop (no GUI)
 if _run_tool_from_cli():
     sys.exit(0)
@@ -112,7 +137,7 @@ def show_description(title, text):
 root = tk.Tk()
 root.attributes("-topmost", True)
 root.title("EPC Merger & Comparison Tool")
-root.geometry("540x600")
+root.geometry("540x900")
 root.configure(bg=BG)
 root.resizable(False, False)
 
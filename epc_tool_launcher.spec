@@ -5,8 +5,8 @@ a = Analysis(
     ['epc_tool_launcher.py'],
     pathex=[],
     binaries=[],
-    datas=[('format_based_sorter.py', '.'), ('epc_file_renamer.py', '.'), ('2_file_renamer.py', '.'), ('epc_merger_reader.py', '.'), ('epc_merger_location.py', '.'), ('epc_merged_final.py', '.'), ('epc_master_comparison.py', '.')],
-    hiddenimports=['pandas', 'numpy', 'openpyxl', 'tzdata', 'tkinter.filedialog', 'tkinter.simpledialog', 'tkinter.ttk', 'tkinter.messagebox'],
+    datas=[('format_based_sorter.py', '.'), ('epc_file_renamer.py', '.'), ('2_file_renamer.py', '.'), ('epc_merger_reader.py', '.'), ('epc_merger_location.py', '.'), ('epc_merged_final.py', '.'), ('epc_master_comparison.py', '.'), ('epc_gs1.py', '.'), ('epc_history.py', '.'), ('epc_location_resolver.py', '.'), ('epc_parse_profile.py', '.'), ('epc_daemon.py', '.'), ('epc_tail_follow.py', '.'), ('epc_parquet_export.py', '.'), ('epc_snapshot_matrix.py', '.'), ('epc_dtypes.py', '.'), ('epc_quality_gate.py', '.'), ('epc_pipeline.py', '.'), ('epc_prefix_match.py', '.'), ('epc_duplicates.py', '.'), ('epc_manifest.py', '.'), ('epc_quick_count.py', '.'), ('epc_checkpoint.py', '.'), ('epc_partial_aggregate.py', '.'), ('epc_csv_backend.py', '.'), ('epc_filter.py', '.'), ('epc_pool_workers.py', '.')],
+    hiddenimports=['pandas', 'numpy', 'openpyxl', 'tzdata', 'tkinter.filedialog', 'tkinter.simpledialog', 'tkinter.ttk', 'tkinter.messagebox', 'concurrent.futures', 'multiprocessing', 'sqlite3', 'csv', 'json', 'argparse', 'http.server', 'pyarrow', 'pyarrow.dataset', 'pyarrow.csv'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
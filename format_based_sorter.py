@@ -7,6 +7,8 @@ from pathlib import Path
 from collections import defaultdict
 import tkinter as tk
 from tkinter import filedialog
+from epc_parse_profile import build_parse_profile, save_parse_profile
+from epc_manifest import is_manifest
 
 def get_format_signature(file_path):
     try:
@@ -56,32 +58,50 @@ def show_loading_popup():
     popup.update()
     return popup
 
-def group_and_sort_files():
-    root = tk.Tk()
-    root.attributes("-topmost", True)
-    root.withdraw()
-    folder = filedialog.askdirectory(title="Select Folder Containing EPC CSV Files")
-    if not folder:
-        print("❌ No folder selected.")
-        return
-
-    popup = show_loading_popup()
-
+def sort_folder(folder):
+    """Move the CSVs of a folder into FormatGroup_X subfolders; returns the group folders"""
     folder_path = Path(folder)
     grouped = defaultdict(list)
 
     for file in folder_path.glob("*.csv"):
+        if is_manifest(file):
+            continue
         signature = get_format_signature(file)
         grouped[signature].append(file)
 
+    group_folders = []
     for idx, (signature, files) in enumerate(grouped.items(), start=1):
         group_folder = folder_path / f"FormatGroup_{idx}"
+        group_folders.append(group_folder)
         group_folder.mkdir(exist_ok=True)
         for f in files:
             dest = group_folder / f.name
             f.rename(dest)
         print(f"✅ Moved {len(files)} files to {group_folder.name} ({signature})")
 
+        # Record the group's layout so the mergers can skip the preview/column dialogs
+        if signature not in ("Deleted", "Unreadable", "Unsupported"):
+            try:
+                profile = build_parse_profile(group_folder / files[0].name, signature)
+                if profile:
+                    save_parse_profile(group_folder, profile)
+                    print(f"🧾 Parse profile saved for {group_folder.name} (EPC column {profile['epc_column']})")
+            except Exception as e:
+                print(f"⚠️ Could not build parse profile for {group_folder.name}: {e}")
+
+    return group_folders
+
+def group_and_sort_files():
+    root = tk.Tk()
+    root.attributes("-topmost", True)
+    root.withdraw()
+    folder = filedialog.askdirectory(title="Select Folder Containing EPC CSV Files")
+    if not folder:
+        print("❌ No folder selected.")
+        return
+
+    popup = show_loading_popup()
+    sort_folder(folder)
     popup.destroy()
 
 if __name__ == "__main__":